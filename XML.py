@@ -1,143 +1,1101 @@
 """
 XML Parser / Editor / Creator
 """
+import asyncio
+import codecs
+import functools
+import gc
+import io
 import itertools as it
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import weakref
+import zlib
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+_whitespace = re.compile(r"[ \t\n]*") #The whitespace that is skipped between tags
+_indent = re.compile(r"[ \t]*")
+_header = re.compile(r"""<[^"'>]*(?:(?:"[^"]*"|'[^']*')[^"'>]*)*>""") #A tag header, up to the first ">" that is not part of a quoted value
+_closer = re.compile(r"</[^ \t\n>]*") #A closing tag sequence, as used to check that the closing tag of a tag exists
+_numeric_reference = re.compile(r"&#(?:([0-9]{1,8})|x([0-9a-fA-F]{1,8}));")
+_encoded_chars = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&apos;")) #Note: "&" has to be encoded first, and decoded last
+_decoded_chars = (("&apos;", "'"), ("&quot;", '"'), ("&gt;", ">"), ("&lt;", "<"), ("&amp;", "&"))
+_escaped_codes = {ord(char): encoded for char, encoded in _encoded_chars}
+_declaration_template = '<?xml version="1.0" encoding="{}"?>\n' #The XML declaration for a given encoding
+_xml_declaration = _declaration_template.format("utf-8") #The XML declaration written at the start of files
+_query_step = re.compile(r"""(/{0,2})(\*|\.|text\(\)|@[^/\[\]\s]+|[^/\[\]@\s]+)((?:\[(?:[^\]'"]|'[^']*'|"[^"]*")*\])*)""") #A location step of a query: separator, node test, predicates
+_binary_header = struct.Struct("<4sHIBBQQQQQ") #The header of binary snapshots: magic, format version, CRC-32 of the remaining data, the item size of the structure codes and of the value lengths, and the number of structure codes, names, values and non-string values, and the size of the text (in bytes)
+_binary_version = 2
+_binary_magic = b"XMLB"
+_binary_formats = ("auto", "short", "long") #The tag formats, by their code in binary snapshots
+_binary_flags = {code | declared: format for code, format in enumerate(_binary_formats) for declared in (0, 4)} #The valid format codes (with the flag for an XML declaration)
+_binary_value = struct.Struct("<IB") #A non-string value in binary snapshots: the index of the value, and its kind (an index in _binary_constants, or int / float)
+_binary_length = struct.Struct("<I")
+_binary_float = struct.Struct("<d")
+_binary_constants = (None, True, False)
+_query_predicate = re.compile(r"""\[\s*(?:([0-9]+)|(last\(\))|(@?)([^\s\]'"=!]+)\s*(?:(!?=)\s*(?:'([^']*)'|"([^"]*)"))?)\s*\]""")
+
+def _decode_numeric_reference(match):
+    """
+    Returns the character referred to by a numeric character reference (or the base escape sequence, for characters that have to be escaped)
+    """
+    code = int(match[1]) if match[1] else int(match[2], 16)
+    if code in _escaped_codes:
+        return _escaped_codes[code]
+    if not 0 < code <= 0x10FFFF or 0xD800 <= code <= 0xDFFF: #Not a valid character; leave the reference as is
+        return match[0]
+    return chr(code)
+
+@functools.lru_cache(maxsize = 256)
+def _compile_query(query):
+    """
+    Compiles a query for XML.select() / XML.select_all() (see XML.iter_select() for the supported syntax)
+
+    Each step is compiled to a tuple (descendant, name, test, filters): whether the step applies to the descendants of the context tags (//) instead of only their children, the tag name (None for *), a function testing the predicates for a single tag (or None), and functions that each filter the list of matching children of a tag (for positional predicates).
+    A "//." step selects the context tags together with their descendants (as in XPath); it makes the step following it apply to the descendants, or, at the end of the query, selects the descendants of the selected tags as well.
+    returns: (tuple, tuple / NoneType, bool) - The steps, ("attribute", name) / ("text",) if the query selects attribute values / text instead of tags, and whether the descendants of the selected tags are selected as well.
+    """
+    steps = []
+    value = None
+    descendants = False #Whether the preceding step was "//."
+    pos = 0
+    while pos < len(query):
+        if (match := _query_step.match(query, pos)) is None or value is not None:
+            raise ValueError(f"Invalid query: '{query}'")
+        separator, test, predicates = match.groups()
+        if separator == "/" if not pos else not separator:
+            raise ValueError(f"Invalid query: '{query}'")
+        pos = match.end()
+        if test in (".", "text()") or test[0] == "@":
+            if predicates or (separator == "//" and test != "."):
+                raise ValueError(f"Invalid query: '{query}'")
+            if test == "text()":
+                value = ("text",)
+            elif test != ".":
+                value = ("attribute", test[1:])
+            elif separator == "//": #The context tags and their descendants; e.g. ".//./a" equals ".//a"
+                descendants = True
+            continue
+        tests = [] #Predicates that can be tested for each tag separately
+        filters = [] #Predicates that depend on the other matching tags (positions), and all predicates following these
+        index = 0
+        while index < len(predicates):
+            if (predicate := _query_predicate.match(predicates, index)) is None:
+                raise ValueError(f"Invalid query: '{query}'")
+            index = predicate.end()
+            position, last, attribute, name, operator = predicate.group(1, 2, 3, 4, 5)
+            compare = predicate[6] if predicate[6] is not None else predicate[7]
+            if position: #Position among the matching children (1 based)
+                position = int(position)
+                filters.append(lambda tags, position = position: tags[position - 1:position] if position else [])
+                continue
+            elif last:
+                filters.append(lambda tags: tags[-1:])
+                continue
+            elif not attribute: #Tags with a child tag with the given name
+                if operator:
+                    raise ValueError(f"Invalid query: '{query}'; only attributes can be compared")
+                check = lambda tag, name = name: tag.find(name, 1) is not None
+            elif operator is None:
+                check = lambda tag, name = name: name in tag._attributes
+            elif operator == "=":
+                check = lambda tag, name = name, compare = compare: tag._attributes.get(name) == compare
+            else:
+                check = lambda tag, name = name, compare = compare: name in tag._attributes and tag._attributes[name] != compare
+            if filters:
+                filters.append(lambda tags, check = check: [tag for tag in tags if check(tag)])
+            else:
+                tests.append(check)
+        if len(tests) > 1:
+            tests = [lambda tag, tests = tuple(tests): all(check(tag) for check in tests)]
+        steps.append((separator == "//" or descendants, None if test == "*" else test, tests[0] if tests else None, tuple(filters)))
+        descendants = False
+    return tuple(steps), value, descendants
+
+def _find_closer(data, closer, pos, closers):
+    """
+    Returns the index of an occurrence of a closing tag sequence in data at or after index pos, or -1 if there is none
+
+    closers: dict - The cache of known occurrences of closing tag sequences (see XML._parse()).
+    Occurrences shortly after pos (as for most tags) or close to the end of data (as for the outermost tags) are searched for directly. Otherwise, the last occurrence of every closing tag sequence in data is collected into closers, in a single pass over data, so that data is not searched again for every tag (e.g. when many differently named tags are nested).
+    """
+    if (index := data.find(closer, pos, pos + 4096)) >= 0 or (index := data.rfind(closer, max(pos, len(data) - 4096))) >= 0:
+        return index
+    if None not in closers:
+        closers.update({match[0]: match.start() for match in _closer.finditer(data)})
+        closers[None] = -1 #Marks that all closing tag sequences have been collected
+    if closers.get(closer, -1) >= pos:
+        return closers[closer]
+    return data.find(closer, pos) #The sequence may still be part of another one (i.e. a longer name); only possible in malformed data
+
+def _find_tag(data, sequence, start, end):
+    """
+    Returns the index of the first occurrence of an opening / closing tag sequence ("<name" / "</name") in data[start:end] that is followed by the end of the name, or -1 if there is none
+    """
+    while (start := data.find(sequence, start, end)) >= 0:
+        if (char := data[start + len(sequence):start + len(sequence) + 1]) and char in " \t\n/>":
+            return start
+        start += 1
+    return -1
+
+def _pack_array(values):
+    """
+    Returns the given (non-negative) ints as little-endian array, with the smallest item size that fits all of them (1, 2 or 4 bytes)
+    """
+    largest = max(values, default = 0)
+    packed = array("B" if largest < 1 << 8 else "H" if largest < 1 << 16 else "I", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed
+
+def _unpack_array(data, pos, count, size):
+    """
+    Decodes an array of count ints with the given item size, as encoded by _pack_array(), starting at index pos of data
+
+    Raises a ValueError if the item size is invalid, or data is too short.
+    """
+    typecode = {1: "B", 2: "H", 4: "I"}.get(size)
+    if typecode is None or array(typecode).itemsize != size:
+        raise ValueError("Corrupt binary XML snapshot")
+    values = array(typecode)
+    values.frombytes(data[pos:pos + count * size])
+    if len(values) != count:
+        raise ValueError("Corrupt binary XML snapshot")
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def _pack_values(values):
+    """
+    Encodes the names / values of a binary snapshot (see XML.to_binary())
+
+    All values are stored as one UTF-8 text, together with the length of each value (in characters, see _pack_array()). Values other than strings are stored as empty strings in the text, and are listed separately, with their index, kind and encoded value.
+    returns: (array, bytes, int, bytes) - The lengths, the text, the number of non-string values, and the encoded non-string values.
+    """
+    extras = []
+    count = 0
+    for index, value in enumerate(values):
+        if isinstance(value, str):
+            continue
+        elif (kind := next((kind for kind, constant in enumerate(_binary_constants) if value is constant), None)) is not None:
+            extras.append(_binary_value.pack(index, kind))
+        elif isinstance(value, int):
+            digits = str(int(value)).encode("ascii")
+            extras.extend((_binary_value.pack(index, 3), _binary_length.pack(len(digits)), digits))
+        elif isinstance(value, float):
+            extras.extend((_binary_value.pack(index, 4), _binary_float.pack(value)))
+        else:
+            raise TypeError(f"Values of type '{type(value).__name__}' cannot be stored in a binary snapshot")
+        count += 1
+    if count:
+        values = [value if isinstance(value, str) else "" for value in values]
+    return _pack_array([len(value) for value in values]), "".join(values).encode("utf-8", "surrogatepass"), count, b"".join(extras)
+
+def _unpack_values(data, pos, count, length_size, text_size, extra_count):
+    """
+    Decodes the names / values of a binary snapshot, as encoded by _pack_values(), starting at index pos of data
+
+    Raises a ValueError if the data does not match the given counts and sizes exactly.
+    returns: list - The values.
+    """
+    lengths = _unpack_array(data, pos, count, length_size)
+    pos += count * length_size
+    text = str(data[pos:pos + text_size], "utf-8", "surrogatepass")
+    pos += text_size
+    ends = list(it.accumulate(lengths))
+    if (ends[-1] if ends else 0) != len(text):
+        raise ValueError("Corrupt binary XML snapshot")
+    values = [text[start:end] for start, end in zip(it.chain((0,), ends), ends)]
+    try:
+        for _ in range(extra_count):
+            index, kind = _binary_value.unpack_from(data, pos)
+            pos += _binary_value.size
+            if kind < len(_binary_constants):
+                value = _binary_constants[kind]
+            elif kind == 3:
+                size, = _binary_length.unpack_from(data, pos)
+                digits = bytes(data[pos + _binary_length.size:pos + _binary_length.size + size])
+                if len(digits) != size:
+                    raise ValueError("Corrupt binary XML snapshot")
+                value = int(digits)
+                pos += _binary_length.size + size
+            elif kind == 4:
+                value, = _binary_float.unpack_from(data, pos)
+                pos += _binary_float.size
+            else:
+                raise ValueError("Corrupt binary XML snapshot")
+            values[index] = value
+    except (struct.error, IndexError):
+        raise ValueError("Corrupt binary XML snapshot") from None
+    if pos != len(data):
+        raise ValueError("Corrupt binary XML snapshot")
+    return values
+
+class _EmptyAttributes(dict):
+    """
+    Read-only empty dict, shared by all tags without attributes until attributes are actually added
+    """
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "_empty_attributes" #Pickle / copy as a reference to the shared instance
+
+    def __readonly(self, *args, **kwargs):
+        raise TypeError("The shared empty attributes cannot be modified")
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = __readonly
+
+_empty_attributes = _EmptyAttributes()
+_assigned_attributes = weakref.WeakKeyDictionary() #The attribute dicts passed to XML() / assigned to XML.attributes, which the caller may still modify directly: {tag: dict}
+
+class _Database(list):
+    """
+    The database of a tag, as returned by XML.database
+
+    As the list may be kept and modified by the caller, every modification lets the tag know, such that its name index and the affected attribute indices are discarded.
+    The tag is only referenced weakly, so that the tag and its list do not keep each other alive (which would leave freeing them to the garbage collector).
+    """
+    __slots__ = ("_tag",)
+
+    def __init__(self, tag, entries):
+        list.__init__(self, entries)
+        self._tag = weakref.ref(tag)
+
+    def __reduce_ex__(self, protocol): #Pickle / copy as a plain list
+        return list, (list(self),)
+
+def _modifies_database(method):
+    """
+    Returns a variant of a list method for _Database, which lets the tag know before the list is modified (and marks the added tags, see _track())
+    """
+    @functools.wraps(method)
+    def modify(self, *args, **kwargs):
+        if (tag := self._tag()) is None:
+            return method(self, *args, **kwargs)
+        tag._changing(True)
+        tag._index = None
+        result = method(self, *args, **kwargs)
+        if tag._history is not None: #Tags added to a copied structure are part of it as well
+            _track(self)
+        return result
+    return modify
+
+for _method in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse"):
+    setattr(_Database, _method, _modifies_database(getattr(list, _method)))
+
+class _Attributes(dict):
+    """
+    The attributes of a tag, as returned by XML.attributes
+
+    Like _Database, every modification lets the (weakly referenced) tag know, such that the affected attribute indices are discarded.
+    """
+    __slots__ = ("_tag",)
+
+    def __init__(self, tag, attributes):
+        dict.__init__(self, attributes)
+        self._tag = weakref.ref(tag)
+
+    def __reduce_ex__(self, protocol): #Pickle / copy as a plain dict
+        return dict, (dict(self),)
+
+def _modifies_attributes(method, keyed):
+    """
+    Returns a variant of a dict method for _Attributes, which lets the tag know before the dict is modified
+
+    keyed: bool - Whether the method only modifies the attribute given as first argument, rather than any of them.
+    """
+    @functools.wraps(method)
+    def modify(self, *args, **kwargs):
+        if (tag := self._tag()) is not None:
+            tag._changing(attributes = args[:1] if keyed else None)
+        return method(self, *args, **kwargs)
+    return modify
+
+for _method in ("__setitem__", "__delitem__", "pop", "setdefault"):
+    setattr(_Attributes, _method, _modifies_attributes(getattr(dict, _method), True))
+for _method in ("__ior__", "clear", "popitem", "update"):
+    setattr(_Attributes, _method, _modifies_attributes(getattr(dict, _method), False))
+
+def _watching(entry):
+    """
+    Returns whether an entry of XML._watch still refers to the current name index / attribute indices of its owner
+    """
+    return (owner := entry[0]()) is not None and (owner._index is entry[1] or owner._attribute_indices is entry[1])
+
+def _register(tag, watch):
+    """
+    Registers a tag with the name index / attribute indices of another tag, which have to be updated when the tag is modified (see XML._changing())
+
+    watch: tuple - ((weak reference to the owner, index),), shared by all tags registered with the same index.
+    The outdated entries of the tag are discarded along the way.
+    """
+    if tag._watch is None or (len(tag._watch) == 1 and tag._watch[0][1] is watch[0][1]):
+        tag._watch = watch
+    elif tag._watch is not watch:
+        tag._watch = (*(entry for entry in tag._watch if entry[1] is not watch[0][1] and _watching(entry)), *watch)
+
+def _track(entries):
+    """
+    Marks the given tags, and all tags nested in them, as part of a structure that copies made using XML.copy(True, copy_on_write = True) may read
+
+    Only marked tags keep their state for these copies when they are modified (see XML._changing()). Tags that are marked already are skipped together with their nested tags, which are always marked as well: tags added to a marked tag are marked along with it. This way, every tag is only visited once, no matter how often its structure is copied.
+    Databases / attributes that have been assigned by the caller (see XML.database) are replaced by copies of their own, as modifying these directly would not reach the copies.
+    """
+    assigned = _assigned_attributes if len(_assigned_attributes) else None
+    stack = [entries]
+    while stack:
+        for tag in stack.pop():
+            if not isinstance(tag, XML) or tag._history is not None:
+                continue
+            tag._history = XML._copies
+            if isinstance(tag, (_Unparsed, _Shared)): #Their nested tags are marked when they are parsed / get their own database
+                continue
+            if type(tag._database) is list:
+                tag._database = tuple(tag._database)
+            if assigned is not None and type(tag._attributes) is dict and assigned.get(tag) is tag._attributes:
+                del assigned[tag]
+                tag._attributes = dict(tag._attributes)
+            stack.append(tag._database)
 
 class XML():
+    __slots__ = ("_name", "_database", "_attributes", "_format", "_declaration", "_index", "_attribute_indices", "_watch", "_history", "__weakref__")
+    _copies = 0 #The number of copies made using copy(True, copy_on_write = True), which identifies the most recent one (see _Epoch)
+
     def __init__(self, name = "", database = None, attributes = None, format = "auto"):
-        self.name = name
-        self.version = None
-        self.encoding = None
-        if database is not None:
-            self.database = database
+        """
+        name: str - The name of the tag.
+        database: list / iterable / NoneType - The contents of the tag: nested XML tags and strings. A given list is used by the tag itself, so it may still be modified afterwards; other iterables are copied.
+        attributes: dict / NoneType - The attributes of the tag as {name: value}. Like a list for the database, a given dict is used by the tag itself.
+        format: str - The format the tag is written in (see set_format()).
+        """
+        self._name = name
+        self._index = None #The nested tags grouped by name: {name: [tags]}, or None if (re)building is required
+        self._attribute_indices = None #The attribute indices created using build_index(): {attribute: ({value: [(depth, tag)]}, [(depth, tag)]), or None if rebuilding is required}
+        self._watch = None #The (weak reference to the owner, name index / attribute indices) of the tags that have indexed this tag, which have to be notified when it is modified (see _changing() and the name setter)
+        self._history = None #The number of copies made when the tag was last modified, for tags of copied structures (see _track()); copies made since may still read its current state (see _changing())
+        self._declaration = None #The (version, encoding) of the XML declaration preceding the tag, if any
+        if database is None:
+            self._database = () #Databases may be stored as tuple (which is more compact) until they are modified
+        elif type(database) is list:
+            self._database = database #Not tracked, as the list may still be modified by the caller (see database)
         else:
-            self.database = []
-        if attributes is not None:
-            self.attributes = attributes
+            self._database = tuple(database)
+        if type(attributes) is dict:
+            self._attributes = _assigned_attributes[self] = attributes #Not tracked, like an assigned database (see attributes)
+        elif attributes:
+            self._attributes = dict(attributes)
         else:
-            self.attributes = {}
-        self.set_format(format)
+            self._attributes = _empty_attributes
+        self._format = "auto"
+        if format != "auto":
+            self.set_format(format)
+
+    def __getstate__(self):
+        return (self._name, self._database, self._attributes, self._format, self._declaration)
+
+    def __setstate__(self, state):
+        self._name, self._database, self._attributes, self._format, self._declaration = state
+        if type(self._database) is list: #Unpickled databases are not shared with anyone
+            self._database = tuple(self._database)
+        self._index = None
+        self._attribute_indices = None
+        self._watch = None
+        self._history = None
 
     @classmethod
-    def XMLFile(cls, filepath = None, include_comments = False, return_trailing = False):
+    def XMLFile(cls, filepath = None, include_comments = False, return_trailing = False, lazy = False, workers = None, stats = None, cache = False):
         """
         Loads an XML structure from a given file path
+
+        lazy / workers / stats: see from_str()
+        cache: bool / XMLCache - If True (or an XMLCache), the parsed structure is kept in a cache (file_cache if True), and reused as long as the file keeps the same size and modification time.
+            A copy of the cached structure is returned every time, so modifying it does not affect the cache. The structure is always parsed completely (lazy is ignored), and the stats (if given) only include actual parses.
         """
         if not filepath:
             return XML()
+        elif cache:
+            return (file_cache if cache is True else cache)._load(cls, filepath, include_comments, return_trailing, workers, stats)
         else:
             with open(filepath, "r", encoding = "utf-8-sig") as file:
                 data = file.read()
-        return cls.from_str("".join(data), include_comments, return_trailing)
+                size = os.fstat(file.fileno()).st_size if stats is not None else 0
+        result = cls.from_str(data, include_comments, return_trailing, lazy, workers, stats)
+        if stats is not None:
+            stats.bytes_parsed += size
+        return result
 
     @classmethod
-    def from_str(cls, data, include_comments = False, return_trailing = False):
+    def from_str(cls, data, include_comments = False, return_trailing = False, lazy = False, workers = None, stats = None):
         """
         Loads an XML structure from a string
 
         data: string - string to be parsed to an XML structure.
         return_trailing: bool - determines whether the text after the parsed element should be returned.
+        lazy: bool - If True, tags are only located instead of parsed. The attributes, text and nested tags of a tag are parsed the first time its database or attributes are accessed (directly or by any method), which makes loading large files much faster if only parts of them are used.
+            Lazy loading behaves identically to normal loading for well-formed files, though errors in malformed files may only be raised once the affected tag is accessed. Until then, the tags are instances of an unparsed subclass of their class (named e.g. UnparsedXML), so isinstance() holds, but type() differs.
+            Note that lazy loading saves the time of parsing the unused tags, but not of scanning them: loading scans the entire document once to find the end of the root, and the first access to a tag locates all of its children (skipping their contents). For example, reaching one record among the 100k children of the root takes about a quarter of the time of a full parse.
+        workers: int / NoneType - If given (and lazy is False), the nested tags of the root are parsed in parallel by this many processes. The result is identical to parsing in a single process.
+            As starting the processes and transferring the tags takes time as well, this is only faster for large documents (of several MB).
+        stats: XMLStats / NoneType - If given, statistics of the parse (sizes, counts and times) are added to it. The time per phase of parsing is only measured if the parse is done by a single process, and not lazily.
         """
-        data = data.lstrip(" \t\n")
-        self = cls() #Set up an XML object to return in the end
+        if stats is not None:
+            start = time.perf_counter()
+        timed = not lazy
+        if lazy:
+            self, end = cls._scan(data, 0, include_comments)
+        elif workers is not None and workers > 1:
+            self, end, timed = cls._parse_parallel(data, include_comments, workers, stats)
+        else:
+            self, end = cls._parse(data, 0, include_comments, stats = stats)
+        if stats is not None:
+            stats._add_parse(self, end, time.perf_counter() - start, timed)
+        if return_trailing: #If requested, also return all unused "trailing" data
+            return self, data[end:]
+        else:
+            return self
 
-        #Find the header position ----------------------------------------------
-        if data[0:1] != "<":
-            raise RuntimeError("No XML tag found. Does the file contain a valid XML structure?")
-        header_end = 0
-        while True:
-            header_end = data.find(">", header_end + 1) #Search for the ">" header ender, starting from the spot after the previous position.
-            if header_end == -1:
-                raise EOFError(f"Unclosed header tag")
-            if not cls.__in_str(data, header_end): #If the ">" was not encased by double quotation marks, and thus was not part of a string / value:
-                header_end += 1 #Move the index over by 1, so it ends using [:header_end] as an index also includes the ">" itself
-                break #Break out of the while loop. The ">" has been found
-
-        #Decode the header -----------------------------------------------------
-        header_data = data[:header_end].removeprefix("<").removesuffix(">")
-
-        if header_data[-1] == "/":
-            self.format = "short"
-            header_data = header_data.removesuffix("/") #Remove the trailing "/" if it exists (which would indicate a short tag)
-        elif header_data[-1] == "?":
-            self.format = "xml header" # Setup a (temporary) format to signal to future code that this is not a standard XML tag and thus shouldn't be returned itself.
-            header_data = header_data.removesuffix("?")
-        elif header_data[0] == "!": # DOCTYPE declaration (will be ignored by parser)
-            return cls.from_str(data[header_end:], include_comments, return_trailing)
+    @classmethod
+    def load_many(cls, filepaths, workers = None, executor = "thread", ordered = True, include_comments = False):
+        """
+        Loads many XML files concurrently, using a pool of threads or processes
+
+        filepaths: iterable - The paths of the files to be loaded.
+        workers: int / NoneType - The number of threads / processes to use (by default, the number of CPU cores).
+        executor: str / Executor - "thread" to load the files in threads, which overlaps reading the files, but (as parsing holds the GIL) parses them one at a time; or "process" to load them in separate processes, which parses them in parallel, but has to transfer the structures back.
+            An existing concurrent.futures executor can be given as well, which is not shut down afterwards.
+        ordered: bool - If True, the results are returned in the same order as filepaths; otherwise, in the order in which the files are loaded.
+
+        returns: iterator - (path, XML, None) for every file that was loaded, or (path, None, exception) for every file that could not be loaded. Errors do not stop the other files from being loaded.
+        Only a few files per worker are loaded ahead of the results that have been consumed, so the memory usage does not depend on the number of files.
+        """
+        if isinstance(executor, str) and executor not in ("thread", "process"):
+            raise ValueError(f"Invalid executor '{executor}'")
+        return cls.__load_many(iter(filepaths), workers, executor, ordered, include_comments)
+
+    @classmethod
+    def __load_many(cls, filepaths, workers, executor, ordered, include_comments):
+        """
+        Returns the iterator over the results of load_many()
+        """
+        if isinstance(executor, str):
+            pool = (ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor)(workers)
         else:
-            self.format == "long"
-        header_data = header_data.split(" ", 1) #Split the header into: [0] The tag name; [1] The attribute list
-        self.name = header_data[0] #Set the tag name
-        if len(header_data) == 2: #If the tag contained any attributes:
-            attributes = cls.__split_str(header_data[1]) #Split the header data at each " or ', to separate the attributes from their value
-            for attr in attributes:
-                self.attributes[attr[0].strip("= \t\n")] = cls.decode(attr[1]) #Set the attribute in the attributes list. For the attribute name, any leading/trailing spaces, and the "=" sign are removed. The data is left unchanged, as anything withing the '"' was part of the string anyway.
-        if self.format == "short": #If the tag is of the short format, and thus consists only of a "header", return it now.
-            if return_trailing: #If requested, also return all unused "trailing" data
-                return self, data[header_end:]
-            else:
-                return self
-        elif self.format == "xml header":
-            xml_body, trailing = cls.from_str(data[header_end:], include_comments, True)
-            xml_body.version = self.get("version", None)
-            xml_body.encoding = self.get("encoding", None)
-            if return_trailing: # If requested, also return all unused "trailing" data
-                return xml_body, trailing
+            pool = executor
+        snapshot = isinstance(pool, ProcessPoolExecutor) #Transfer the structures as binary snapshots (see _load_file())
+        pending = {} #{future: path} of the files being loaded, in the order they were submitted
+        def submit(count):
+            for filepath in it.islice(filepaths, count):
+                pending[pool.submit(_load_file, cls, filepath, include_comments, snapshot)] = filepath
+        try:
+            submit(2 * (workers or os.cpu_count() or 1))
+            while pending:
+                if ordered:
+                    future = next(iter(pending))
+                else:
+                    future = next(iter(wait(pending, return_when = FIRST_COMPLETED).done))
+                filepath = pending.pop(future)
+                submit(1)
+                try:
+                    tag = future.result()
+                except Exception as error:
+                    yield filepath, None, error
+                else:
+                    yield filepath, cls.from_binary(tag) if snapshot else tag, None
+        finally:
+            for future in pending:
+                future.cancel()
+            if pool is not executor:
+                pool.shutdown()
+
+    @classmethod
+    async def aload(cls, filepath, include_comments = False, return_trailing = False, lazy = False, workers = None, stats = None, cache = False, executor = None):
+        """
+        Loads an XML structure from a given file path like XMLFile(), without blocking the event loop, e.g.:
+            root = await XML.aload("export.xml")
+
+        The file is read and parsed in a thread of the default executor of the event loop, or in the given (concurrent.futures) executor.
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(cls.XMLFile, filepath, include_comments, return_trailing, lazy, workers, stats, cache))
+
+    @classmethod
+    def iterparse(cls, source, events = ("end",), include_comments = False, chunk_size = 65536):
+        """
+        Parses an XML file incrementally, yielding (event, tag) pairs as tags are opened / completed
+
+        source: string / filepath / file object - The file (or path to the file) to be parsed. The file is read in chunks, so it never has to fit in memory as a whole.
+        events: iterable - The events that should be reported. "start" is reported once the header of a tag has been parsed (its database is still empty at this point), "end" once the tag is completed.
+        chunk_size: int - The number of characters (or bytes) read from the file at once.
+
+        Completed tags are added to their parent before their "end" event is reported. To keep the memory usage bounded, remove tags from their parent once they have been processed, e.g.:
+            root = None
+            for event, tag in XML.iterparse("export.xml", ("start", "end")):
+                if root is None:
+                    root = tag
+                elif event == "end" and tag.name == "record":
+                    process(tag)
+                    root.database.clear()
+        """
+        parser = XMLParser(include_comments, events, cls)
+        if not hasattr(source, "read"):
+            file = open(source, "r", encoding = "utf-8-sig")
+        elif isinstance(source, (io.RawIOBase, io.BufferedIOBase)): #Binary files are decoded the same way XMLFile does.
+            file = io.TextIOWrapper(source, encoding = "utf-8-sig")
+        else:
+            file = source
+        try:
+            while parser.root is None and (chunk := file.read(chunk_size)):
+                parser.feed(chunk)
+                yield from parser.read_events()
+            parser.close()
+            yield from parser.read_events()
+        finally:
+            if file is not source:
+                if hasattr(source, "read"):
+                    file.detach() #Do not close the file object that was passed in
+                else:
+                    file.close()
+
+    @classmethod
+    def from_binary(cls, source):
+        """
+        Loads an XML structure from a binary snapshot created by to_binary()
+
+        source: string / filepath / file object / bytes-like - The path to the snapshot (which is memory-mapped instead of read), a (binary) file to read it from, or the snapshot data itself (e.g. an mmap object).
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as file:
+                try:
+                    data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+                except ValueError: #Empty files cannot be mapped
+                    data = b""
+            try:
+                return cls.from_binary(data)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        if hasattr(source, "read"):
+            source = source.read()
+        with memoryview(source) as data:
+            if len(data) < _binary_header.size or data[:4] != _binary_magic:
+                raise ValueError("Not a binary XML snapshot")
+            _, version, checksum, code_size, length_size, code_count, name_count, value_count, text_size, extra_count = _binary_header.unpack_from(data)
+            if version != _binary_version:
+                raise ValueError(f"Unsupported binary XML snapshot version {version}")
+            with data[_binary_header.size:] as body:
+                if zlib.crc32(body) != checksum or code_size * code_count + length_size * (name_count + value_count) + text_size > len(body):
+                    raise ValueError("Corrupt binary XML snapshot")
+                codes = _unpack_array(body, 0, code_count, code_size)
+                values = _unpack_values(body, code_count * code_size, name_count + value_count, length_size, text_size, extra_count)
+        names = {index + 2: sys.intern(name) for index, name in enumerate(values[:name_count])} #A dict rather than a list, such that invalid indices raise an error as well
+        #The structure codes list the tags in document order: for each tag, its name, format (and declaration flag), its attribute count and attribute names, followed by its database (0 for a value), and 1 at its end. Names are referred to by their index + 2.
+        #The values hold the declarations, attribute values and values in the databases, in the same order.
+        collect = gc.isenabled()
+        gc.disable() #Like unpickling, this creates many objects at once, which would otherwise trigger needless garbage collections
+        try:
+            codes = iter(codes)
+            values = iter(values[name_count:])
+            code, value = codes.__next__, values.__next__
+            new = object.__new__
+            stack = []
+            for tag_code in codes:
+                if tag_code >= 2:
+                    tag = new(cls)
+                    tag._name = names[tag_code]
+                    flags = code()
+                    tag._format = _binary_flags[flags]
+                    tag._declaration = (value(), value()) if flags & 4 else None
+                    count = code()
+                    tag._attributes = {names[code()]: value() for _ in range(count)} if count else _empty_attributes
+                    tag._index = None
+                    tag._attribute_indices = None
+                    tag._watch = None
+                    tag._history = None
+                    if stack:
+                        database.append(tag)
+                    database = []
+                    stack.append((tag, database))
+                elif not stack:
+                    break
+                elif tag_code == 0:
+                    database.append(value())
+                else:
+                    tag, database = stack.pop()
+                    tag._database = tuple(database)
+                    if not stack:
+                        if next(codes, None) is None and next(values, stack) is stack: #All codes and values have to be used
+                            return tag
+                        break
+                    database = stack[-1][1]
+        except (StopIteration, KeyError):
+            pass
+        finally:
+            if collect:
+                gc.enable()
+        raise ValueError("Corrupt binary XML snapshot")
+
+    @classmethod
+    def _parse(cls, data, pos = 0, include_comments = False, closers = None, stack = None, events = None, final = True, lazy = False, stats = None):
+        """
+        Parses the first XML element found in data, starting at index pos
+
+        The string is never sliced beyond the header / text currently being decoded; instead a single index is moved through data.
+        closers: dict / NoneType - Cache of an index of every closing tag sequence in data, at or after which it is known to occur. May be shared between calls on the same string.
+        stack: list / NoneType - The currently opened (long format) tags as [tag, closing sequence, declaration, resumed]. Pass the same list again to resume parsing a partially parsed element.
+        events: list / NoneType - If given, ("start", tag) and ("end", tag) tuples are appended to it whenever a tag is opened / completed.
+        final: bool - Whether data contains the remainder of the document. If False, parsing stops (instead of raising an error) once the end of data is reached.
+        lazy: bool - If True, the nested tags of the element are only located (see _scan()) instead of parsed. Cannot be combined with stack / events / final.
+        stats: XMLStats / NoneType - If given, the skipped comments are counted, and (if enabled) the time spent decoding and building tags is measured.
+
+        returns: (XML, int) - The parsed element, and the index directly after it. If more data is required, (None, index to resume parsing from) is returned instead.
+        """
+        if closers is None:
+            closers = {}
+        if stack is None:
+            stack = []
+        new, parse_header, decode = cls, cls._parse_header, cls.decode
+        if stats is not None and stats.timings: #Only the timed variants cost any extra time; the counts are mostly taken from the result.
+            new, parse_header, decode = stats._timed(new, "build"), stats._timed(parse_header, "decode"), stats._timed(decode, "decode")
+        declaration = None #The (version, encoding) of the outermost XML declaration (<?...?>) preceding the tag that is being parsed
+        header = not stack #Whether a tag header is expected next, or the body of the innermost opened tag
+        resume = pos #The index parsing has to restart from if the current header(s) turn out to be incomplete
+        body = -1 #The index at which the body of the most recently opened tag starts
+        if stack:
+            if stack[-1][3]: #Parsing halted in between two entries of the body; skip the spacing in between them.
+                pos = _whitespace.match(data, pos).end()
+            else: #Parsing halted directly after the header of the tag
+                body = pos
+        while True:
+            if header:
+                #Decode the header ---------------------------------------------
+                pos = _whitespace.match(data, pos).end()
+                if data[pos:pos + 1] != "<":
+                    if pos >= len(data) and not final:
+                        return None, resume
+                    raise RuntimeError("No XML tag found. Does the file contain a valid XML structure?")
+                if (match := _header.match(data, pos)) is None:
+                    if not final:
+                        return None, resume
+                    raise EOFError(f"Unclosed header tag")
+                header_data = data[pos + 1:match.end() - 1]
+                pos = match.end()
+                if header_data[-1] == "/":
+                    format = "short"
+                    header_data = header_data[:-1] #Remove the trailing "/" (which indicates a short tag)
+                elif header_data[-1] == "?":
+                    format = "xml header"
+                    header_data = header_data[:-1]
+                elif header_data[0] == "!": # DOCTYPE declaration (will be ignored by parser)
+                    continue
+                else:
+                    format = "auto"
+                name, attributes = parse_header(header_data)
+                if format == "xml header": #Not a standard XML tag; its values are passed on to the tag that follows it instead.
+                    if declaration is None:
+                        declaration = (attributes.get("version", None), attributes.get("encoding", None))
+                    continue
+                tag = new()
+                tag._name = name
+                tag._attributes = attributes
+                tag._format = format
+                if events is not None:
+                    events.append(("start", tag))
+                if format == "short": #Short tags consist of only a header, and are thus finished immediately.
+                    tag._declaration = declaration
+                    if not stack:
+                        if events is not None:
+                            events.append(("end", tag))
+                        return tag, pos
+                    stack[-1][0]._database.append(tag)
+                    if events is not None:
+                        events.append(("end", tag))
+                    pos = _whitespace.match(data, pos).end()
+                else:
+                    tag._database = []
+                    stack.append([tag, f"</{name}", declaration, False])
+                    body = pos
+                declaration = None
+                header = False
+
+            #Decode the body of the XML tag(s) ---------------------------------
+            tag, closer, tag_declaration, _ = frame = stack[-1]
+            while not data.startswith(closer, pos): #While the next part in the data is not this tag's own end tag, there must be another child in between:
+                if not final:
+                    if len(data) - pos < max(len(closer), 4): #Too little data left to tell what comes next
+                        frame[3] = pos != body
+                        return None, pos
+                else:
+                    if closers.get(closer, -1) < pos: #The closing tag has to occur somewhere after the current position
+                        if (last := _find_closer(data, closer, pos, closers)) < 0:
+                            raise EOFError(f"No valid closing tag found for tag with name '{tag.name}'")
+                        closers[closer] = last
+                if data.startswith("<!--", pos):
+                    if (comment_end := data.find("-->", pos + 4)) < 0:
+                        if not final:
+                            frame[3] = pos != body
+                            return None, pos
+                        raise EOFError("Missing comment closing sequence (-->)")
+                    if include_comments:
+                        tag._database.append(data[pos:comment_end + 3])
+                    elif stats is not None:
+                        stats.comments_skipped += 1
+                    pos = comment_end + 3
+                elif data.startswith("<", pos): # If the next entry is an XML tag, decode its header first
+                    if lazy: #Unless it only has to be located
+                        child, pos = cls._scan(data, pos, include_comments)
+                        tag._database.append(child)
+                    else:
+                        header = True
+                        resume = pos
+                        break
+                else:
+                    if (tag_index := data.find("<", pos)) < 0: #Only reachable if not final
+                        frame[3] = pos != body
+                        return None, pos
+                    text = data[pos:tag_index]
+                    if not text.isspace(): #If the next part is not just completely whitespace.
+                        # Only remove whitespace for multi-line text
+                        if "\n" in text:
+                            tag._database.append(decode("\n".join(line.strip(" \t") for line in text.rstrip(" \t\n").split("\n"))))
+                        else:
+                            tag._database.append(decode(text))
+                    pos = tag_index
+                pos = _whitespace.match(data, pos).end() #Skip any spacing that was between two XML tags.
             else:
-                return xml_body
-
-        #Decode the body of the XML tag ----------------------------------------
-        data = data[header_end:]
-        while index := data.find(f"</{self.name}"): #While the next part in the data is not this data's own end tag, there must be another child in between:
-            if index == -1:
-                raise EOFError(f"No valid closing tag found for tag with name '{self.name}'")
-            if not data.find("<!--"):
-                if (comment_end := data.find("-->", 4)) < 0:
+                #Skip the end tag ----------------------------------------------
+                end = _indent.match(data, pos + len(closer)).end()
+                if data[end:end + 1] != ">":
+                    if end >= len(data) and not final:
+                        frame[3] = pos != body
+                        return None, pos
+                    raise EOFError(f"Invalid closing tag (missing '>') for tag with name '{tag.name}'")
+                pos = end + 1
+                stack.pop()
+                tag._declaration = tag_declaration
+                tag._database = tuple(tag._database)
+                if not stack:
+                    if events is not None:
+                        events.append(("end", tag))
+                    return tag, pos
+                stack[-1][0]._database.append(tag)
+                if events is not None:
+                    events.append(("end", tag))
+                pos = _whitespace.match(data, pos).end()
+
+    @classmethod
+    def _parse_parallel(cls, data, include_comments, workers, stats = None):
+        """
+        Parses the first XML element in data, like _parse(data, 0, include_comments), using multiple processes
+
+        The body of the element is split in between its entries into a few chunks per worker. Each chunk is parsed as (part of) the body of the element by _parse_chunk(), after which the parts are joined again.
+        If the element cannot be split, or any part fails to parse, it is parsed by _parse() instead, to raise the same errors.
+        stats: XMLStats / NoneType - If given, the skipped comments are counted in it (see from_str()). The time per phase of parsing is only measured if the element is parsed by _parse().
+
+        returns: (XML, int, bool) - The parsed element, the index directly after it, and whether it was parsed by _parse().
+        """
+        try:
+            name, format, _, _, pos = cls.__locate(data, 0)
+            closer = f"</{name}"
+            bounds = cls.__split(data, pos, closer, len(data) // (workers * 4)) if format != "short" else []
+            end = _indent.match(data, bounds[-1] + len(closer)).end() if len(bounds) > 2 else -1
+        except (EOFError, RuntimeError, IndexError):
+            end = -1
+        if data[end:end + 1] != ">": #Nothing to split (or malformed)
+            return (*cls._parse(data, 0, include_comments, stats = stats), True)
+        chunks = [data[start:stop] + closer + ">" for start, stop in zip(bounds, bounds[1:])]
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                parts = list(executor.map(_parse_chunk, it.repeat(cls), chunks, [None] + [closer] * (len(chunks) - 1), it.repeat(include_comments), it.repeat(stats is not None)))
+        except Exception:
+            return (*cls._parse(data, 0, include_comments, stats = stats), True)
+        tags = [cls.from_binary(part) for part, _ in parts]
+        if stats is not None:
+            stats.comments_skipped += sum(skipped for _, skipped in parts)
+        root = tags[0]
+        root._database = tuple(it.chain.from_iterable(tag._database for tag in tags))
+        return root, end + 1, False
+
+    @classmethod
+    def __split(cls, data, pos, closer, size):
+        """
+        Splits the body of a tag into chunks of at least size characters, in between its entries
+
+        pos: int - The index directly after the header of the tag.
+        closer: str - The closing tag sequence of the tag.
+
+        returns: list - 0, followed by the indices at which the chunks (other than the first) start, and finally the index of the closing tag.
+        """
+        bounds = [0]
+        split = pos + size
+        declared = False #Whether the previous entry was an XML declaration
+        while True:
+            pos = _whitespace.match(data, pos).end()
+            if data.startswith(closer, pos):
+                bounds.append(pos)
+                return bounds
+            if data.startswith("<!--", pos):
+                if (pos := data.find("-->", pos + 4)) < 0:
                     raise EOFError("Missing comment closing sequence (-->)")
-                child = data[:comment_end + 3] if include_comments else None #If comments should not be included, set it to None to be ignored.
-                data = data[comment_end + 3:]
-            elif not (tag_index := data.find("<")): # If the next entry is an XML tag
-                child, data = cls.from_str(data, include_comments, True)
-            elif not data[:tag_index].isspace(): #If the next part is not just completely whitespace.
-                # Only remove whitespace for multi-line text
-                if "\n" in data[:tag_index]:
-                    child = cls.decode("\n".join(line.strip(" \t") for line in data[:tag_index].rstrip(" \t\n").split("\n")))
-                else:
-                    child = cls.decode(data[:tag_index])
-                data = data[tag_index:]
+                pos += 3
+            elif data.startswith("<", pos):
+                if pos >= split and not declared:
+                    bounds.append(pos)
+                    split = pos + size
+                if (match := _header.match(data, pos)) is None:
+                    raise EOFError(f"Unclosed header tag")
+                start, pos = pos, match.end()
+                declared = False
+                if data[pos - 2] == "/": #Short tag
+                    continue
+                elif data[pos - 2] == "?": #XML declaration; the tag that follows it has to be part of the same chunk
+                    declared = True
+                elif data[start + 1] != "!": #Not a DOCTYPE declaration
+                    pos = cls.__skip(data, pos, sys.intern(data[start + 1:pos - 1].split(" ", 1)[0]))[1]
+            elif (pos := data.find("<", pos)) < 0:
+                raise EOFError(f"No valid closing tag found for tag with name '{closer[2:]}'")
+
+    @classmethod
+    def _scan(cls, data, pos = 0, include_comments = False):
+        """
+        Locates the first XML element found in data, starting at index pos, without parsing it
+
+        Only the name of the element is read from its header; its body is skipped by searching for the matching closing tag. The element is parsed once its database or attributes are accessed, which locates all of its nested tags at once (the database has to be complete, as it is used as a sequence everywhere).
+
+        returns: (XML, int) - The unparsed element, and the index directly after it.
+        """
+        name, format, declaration, start, pos = cls.__locate(data, pos)
+        if format == "short":
+            end = pos
+        else:
+            end, pos = cls.__skip(data, pos, name)
+        tag = cls()
+        tag._name = name
+        tag._format = format
+        tag._declaration = declaration
+        tag._database = _Source(data, start, end, name, include_comments)
+        tag.__class__ = _Unparsed.variant(cls)
+        return tag, pos
+
+    @classmethod
+    def __locate(cls, data, pos):
+        """
+        Finds the header of the first XML element found in data, starting at index pos
+
+        returns: (str, str, tuple, int, int) - The name, format and declaration of the element, and the indices at which its header starts / ends.
+        """
+        declaration = None
+        while True:
+            pos = _whitespace.match(data, pos).end()
+            if data[pos:pos + 1] != "<":
+                raise RuntimeError("No XML tag found. Does the file contain a valid XML structure?")
+            if (match := _header.match(data, pos)) is None:
+                raise EOFError(f"Unclosed header tag")
+            start, pos = pos, match.end()
+            header_data = data[start + 1:pos - 1]
+            if header_data[-1] == "/":
+                format = "short"
+                header_data = header_data[:-1]
+                break
+            elif header_data[-1] == "?": #The XML declaration is passed on to the tag that follows it.
+                if declaration is None:
+                    attributes = cls._parse_header(header_data[:-1])[1]
+                    declaration = (attributes.get("version", None), attributes.get("encoding", None))
+            elif header_data[0] != "!": #DOCTYPE declarations are ignored
+                format = "auto"
+                break
+        return sys.intern(header_data.split(" ", 1)[0]), format, declaration, start, pos
+
+    @staticmethod
+    def __skip(data, pos, name):
+        """
+        Finds the closing tag of a (long format) tag, whose header ends at index pos
+
+        Rather than decoding the body of the tag, only the comments and the tags with the same name are looked at, to keep track of the nesting depth. These are searched for as plain strings, so that nothing has to be compiled or kept per tag name. The comments / tags with the same name are only searched for up to the next closing tag, such that no part of the body is searched more than once for each of them.
+
+        returns: (int, int) - The index of the closing tag, and the index directly after it.
+        """
+        opener, closer = "<" + name, "</" + name
+        depth = 1
+        closing = -1 #The index of the next closing tag, if it is at or after pos
+        comment = opening = -1 #The index of the next comment / tag with the same name, or -1 if there is none before index comments / openings
+        comments = openings = pos
+        while True:
+            if closing < pos and (closing := _find_tag(data, closer, pos, len(data))) < 0:
+                break
+            if 0 <= comment < pos: #Passed; search for the next one
+                comment, comments = -1, pos
+            if comment < 0 and comments < closing:
+                comment, comments = data.find("<!--", max(comments, pos), closing), closing
+            if 0 <= opening < pos:
+                opening, openings = -1, pos
+            if opening < 0 and openings < closing:
+                opening, openings = _find_tag(data, opener, max(openings, pos), closing), closing
+            if comment >= 0 and (opening < 0 or comment < opening): #Skip comments entirely, as they may contain anything
+                if (pos := data.find("-->", comment + 4)) < 0:
+                    raise EOFError("Missing comment closing sequence (-->)")
+                pos += 3
+            elif opening >= 0:
+                if (header := _header.match(data, opening)) is None:
+                    raise EOFError(f"Unclosed header tag")
+                pos = header.end()
+                if data[pos - 2] != "/": #Nested tag with the same name, which is not a short tag
+                    depth += 1
             else:
-                child = None
-            if child is not None:
-                self.database.append(child) #Append the tag to the database
-            data = data.lstrip(" \t\n") #Strip any spacing that was between two XML tags.
-
-        #Remove the end tag from the data --------------------------------------
-        data = data.removeprefix(f"</{self.name}").lstrip(" \t")
-        if data[:1] != ">":
-            raise EOFError(f"Invalid closing tag (missing '>') for tag with name '{self.name}'")
-        data = data.removeprefix(">")
-
-        #Return whatever data is necessary
-        if return_trailing:
-            return self, data
+                depth -= 1
+                if not depth:
+                    end = _indent.match(data, closing + len(closer)).end()
+                    if data[end:end + 1] != ">":
+                        raise EOFError(f"Invalid closing tag (missing '>') for tag with name '{name}'")
+                    return closing, end + 1
+                pos = closing + len(closer)
+        raise EOFError(f"No valid closing tag found for tag with name '{name}'")
+
+    @classmethod
+    def _parse_header(cls, header_data):
+        """
+        Splits the contents of a tag header (without the enclosing "<" and ">") into the tag name and its attributes
+
+        returns: (str, dict) - The tag name, and the decoded attributes.
+        """
+        header_data = header_data.split(" ", 1) #Split the header into: [0] The tag name; [1] The attribute list
+        if len(header_data) == 2 and (attributes := cls.__split_str(header_data[1])): #If the tag contained any attributes: Split the header data at each " or ', to separate the attributes from their value
+            #For the attribute name, any leading/trailing spaces, and the "=" sign are removed. The data is left unchanged, as anything withing the '"' was part of the string anyway.
+            return sys.intern(header_data[0]), {sys.intern(attr.strip("= \t\n")): cls.decode(value) for attr, value in attributes}
+        return sys.intern(header_data[0]), _empty_attributes
+
+    @property
+    def name(self):
+        """
+        The name of the tag
+        """
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._changing()
+        if self._watch is not None: #Update the name indices of the tags containing this tag
+            for reference, index in self._watch:
+                if (owner := reference()) is None or owner._index is not index or not (count := index.get(self._name, ()).count(self)):
+                    continue
+                tags = index[self._name]
+                if count > 1 or name in index: #The position of the tag among the other tags with its new name is unknown; rebuild the index on its next lookup instead
+                    owner._index = None
+                elif len(tags) == 1:
+                    del index[self._name]
+                    index[name] = tags
+                else:
+                    tags.remove(self)
+                    index[name] = [self]
+        self._name = name
+
+    @property
+    def format(self):
+        """
+        The format the tag is written in: "auto", "long" or "short" (see set_format())
+        """
+        return self._format
+
+    @format.setter
+    def format(self, format):
+        self._changing()
+        self._format = format
+
+    @property
+    def version(self):
+        """
+        The XML version given by the declaration (<?xml ...?>) preceding the tag
+        """
+        return self._declaration[0] if self._declaration else None
+
+    @version.setter
+    def version(self, version):
+        self._declaration = (version, self.encoding)
+
+    @property
+    def encoding(self):
+        """
+        The encoding given by the declaration (<?xml ...?>) preceding the tag
+        """
+        return self._declaration[1] if self._declaration else None
+
+    @encoding.setter
+    def encoding(self, encoding):
+        self._declaration = (self.version, encoding)
+
+    @property
+    def database(self):
+        """
+        The contents of the tag: nested XML tags and strings (text / comments)
+
+        The returned list may be kept and modified; the tag is notified of every modification.
+        A list that is assigned (or passed to XML()) is used by the tag itself as well. As the tag is not notified when such a list is modified directly, the name index of the tag is not kept for it, and attribute indices covering the tag are rebuilt on every lookup.
+        The exception are tags of structures that have been copied using copy(True, copy_on_write = True), which use copies of assigned lists instead (see copy()).
+        """
+        if type(self._database) is list: #Assigned by the caller
+            return self._database
+        if type(self._database) is not _Database or self._database._tag() is not self:
+            self._database = _Database(self, self._database)
+        return self._database
+
+    @database.setter
+    def database(self, database):
+        self._changing(True)
+        self._index = None
+        if type(database) is list and self._history is None:
+            self._database = database
         else:
-            return self
+            self._database = tuple(database)
+            if self._history is not None:
+                _track(self._database)
+
+    @property
+    def attributes(self):
+        """
+        The attributes of the tag as {name: value}
+
+        Like the database, the returned dict may be kept and modified, and a dict that is assigned (or passed to XML()) is used by the tag itself. Attribute indices covering a tag with such a dict are rebuilt on every lookup.
+        """
+        if type(self._attributes) is dict and _assigned_attributes.get(self) is self._attributes: #Assigned by the caller
+            return self._attributes
+        if type(self._attributes) is not _Attributes or self._attributes._tag() is not self:
+            self._attributes = _Attributes(self, self._attributes)
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes):
+        self._changing(attributes = None)
+        if type(attributes) is dict and self._history is None:
+            self._attributes = _assigned_attributes[self] = attributes
+        else:
+            _assigned_attributes.pop(self, None)
+            self._attributes = dict(attributes) if attributes else _empty_attributes
 
     def __getitem__(self, item):
-        if item in self.attributes: #If the item is an attribute, return the attribute's value
-            return self.attributes[item]
+        if item in self._attributes: #If the item is an attribute, return the attribute's value
+            return self._attributes[item]
         elif isinstance(item, int): #Elif the item is an integer index, return the corresponding child
-            return self.database[item]
-        elif item in (itm.name for itm in self.tags): #Elif the item is the name of any of the children, return the child.
-            return self.database[[itm.name for itm in self.tags].index(item)] #Find the index of the first item with the same name, and return the item at that index.
+            return self._database[item]
+        elif tags := self.__index().get(item): #Elif the item is the name of any of the children, return the (first) child.
+            return tags[0]
         else:
             raise KeyError(item)
 
     def __setitem__(self, item, value):
-        if isinstance(item, int) and item < len(self.database):
-            self.database[item] = value
+        if isinstance(item, int) and item < len(self._database):
+            structure = isinstance(self._database[item], XML) or isinstance(value, XML)
+            self._changing(structure)
+            if structure:
+                self._index = None
+            list.__setitem__(self.__mutable_database(), item, value)
+            if self._history is not None:
+                _track((value,))
         else:
-            self.attributes[item] = value
+            self._changing(attributes = (item,))
+            dict.__setitem__(self.__mutable_attributes(), item, value)
 
     def get(self, key, default = None, /):
         """
@@ -152,21 +1110,141 @@ class XML():
         """
         Append a value (either a new XML tag, or a str) to the database
         """
-        self.database.append(value)
+        self._changing(isinstance(value, XML))
+        list.append(self.__mutable_database(), value) #Bypasses the notification of _Database, as the name index is updated instead of discarded
+        if isinstance(value, XML):
+            if self._index is not None:
+                self._index.setdefault(value._name, []).append(value)
+                _register(value, ((weakref.ref(self), self._index),))
+            if self._history is not None:
+                _track((value,))
+
+
+    def __mutable_database(self):
+        """
+        Returns the database as list, converting it from the (compact) tuple form if required
+        """
+        if type(self._database) is tuple:
+            self._database = _Database(self, self._database)
+        return self._database
+
+    def __mutable_attributes(self):
+        """
+        Returns the attributes as dict, replacing the shared empty attributes if required
+        """
+        if self._attributes is _empty_attributes:
+            self._attributes = {}
+        return self._attributes
+
+    def _changing(self, structure = False, attributes = ()):
+        """
+        Lets the copies and attribute indices depending on the tag know that it is about to be modified
+
+        If the tag is part of a copied structure, and any copies (made using copy(True, copy_on_write = True)) that were made since it was last modified are still alive, the current state of the tag is kept for them first (see __preserve()).
+        The attribute indices covering the tag are discarded as far as they are affected, such that they are rebuilt on their next lookup.
+        structure: bool - Whether nested tags are added / removed, which affects all indices of the tag itself, and of the tags that have indexed it.
+        attributes: tuple / NoneType - The names of the attributes that are modified, or None if any of them may be.
+        """
+        if self._history is not None and self._history < XML._copies:
+            self.__preserve()
+        if structure and self._attribute_indices:
+            self._attribute_indices = dict.fromkeys(self._attribute_indices) #Replaced instead of cleared, so that the registrations of the nested tags become outdated
+        if self._watch is not None and (structure or attributes != ()):
+            watch = [] #The entries that remain valid
+            for entry in self._watch:
+                if (owner := entry[0]()) is None:
+                    continue
+                indices = entry[1]
+                if owner._index is indices: #The name index of a tag containing this tag, which only depends on its name
+                    watch.append(entry)
+                elif owner._attribute_indices is not indices: #Skips owners whose indices have been discarded since
+                    continue
+                elif structure:
+                    owner._attribute_indices = dict.fromkeys(indices)
+                else:
+                    watch.append(entry)
+                    for attribute in indices if attributes is None else attributes:
+                        if attribute in indices:
+                            indices[attribute] = None
+            if not watch:
+                self._watch = None
+            elif len(watch) < len(self._watch):
+                self._watch = tuple(watch)
+
+    def __preserve(self):
+        """
+        Keeps the current state of the tag for the copies made since it was last modified, which may still read it (see _Epoch)
 
+        Only tags of copied structures are kept (see _track()), so modifying other tags, such as the tags the copies are added to, does not cost anything. Keeping the state only takes time proportional to the tag itself: its database is kept as tuple, and its attributes as a copy.
+        The state is shared by all these copies (even by copies of other structures, as tags only know whether any copy may read them).
+        """
+        history = self._history
+        state = None
+        for number, reference in reversed(_Epoch.live):
+            if number <= history: #Made before the current state; it reads an earlier state (if any)
+                break
+            if (epoch := reference()) is not None:
+                if state is None:
+                    attributes = self._attributes
+                    state = (self._name, self._format, attributes if attributes is _empty_attributes else dict(attributes), tuple(self._database))
+                epoch.states[self] = state
+        self._history = XML._copies
+
+    def _view(self, epoch = None):
+        """
+        Returns the state of the tag for reading only, without copying shared tags (see _Shared)
+
+        epoch: _Epoch / NoneType - The copy the tag is read for, if it is a tag of the original structure of that copy; None to read the tag itself.
+        returns: (str, str, dict, sequence, _Epoch / NoneType) - The name, format, attributes and database of the tag, and the copy the nested tags in the database are read for.
+        """
+        if epoch is not None and (state := epoch.states.get(self)):
+            return (*state, epoch)
+        if type(self) is _Shared: #Read the state from the original tag instead
+            name, format = self._name, self._format
+            _, _, attributes, database, epoch = _database_slot.__get__(self)._view(_index_slot.__get__(self))
+            return name, format, attributes, database, epoch
+        return self._name, self._format, self._attributes, self._database, epoch
+
+    def __index(self):
+        """
+        Returns the nested tags grouped by name, (re)building the index if required
+
+        The index is not kept for databases assigned by the caller, which may be modified without the tag knowing.
+        """
+        if type(self._database) is list:
+            index = {}
+            for tag in self._database:
+                if isinstance(tag, XML):
+                    index.setdefault(tag._name, []).append(tag)
+            return index
+        if self._index is None:
+            index = {}
+            watch = ((weakref.ref(self), index),) #Shared by all nested tags, like the registrations of the attribute indices
+            for tag in self._database:
+                if isinstance(tag, XML):
+                    if tag._name in index:
+                        index[tag._name].append(tag)
+                    else:
+                        index[tag._name] = [tag]
+                    if tag._watch is None: #Such that renaming the tag updates the index
+                        tag._watch = watch
+                    else:
+                        _register(tag, watch)
+            self._index = index
+        return self._index
 
     def keys(self):
         """
         Returns the list of all attribute names
         """
-        keys = list(self.attributes.keys())
+        keys = list(self._view()[2].keys())
         return keys
 
     def __str__(self):
         return f"<XML object {self.name}>"
 
     def __repr__(self):
-        return f"<XML object {self.name} with keys {self.keys()} and {len(self.database)} children>"
+        return f"<XML object {self.name} with keys {self.keys()} and {len(self._view()[3])} children>"
 
     def test_attr(self, attributes, values = None):
         """
@@ -190,9 +1268,9 @@ class XML():
             values = len(attributes) * (values,)
 
         #Test if all given attributes exist
-        if all(attr in self.keys() for attr in attributes):
+        if all(attr in self._attributes for attr in attributes):
             #Test if all given attributes have the requested value (or the value is irrelevant (None))
-            if all(self[attr] == val for attr, val in zip(attributes, values) if val is not None):
+            if all(self._attributes[attr] == val for attr, val in zip(attributes, values) if val is not None):
                 return True
         #If any of the tests failed, return None
         return False
@@ -204,7 +1282,10 @@ class XML():
         If value is None, returns the first item that has the given attribute.
 
         Useful for example when there is a list of parts, each having an attribute "id", where you want to find a part with a specific id.
+        If many lookups are made for the same attribute, build_index() can be used to avoid searching the entire structure for each lookup.
         """
+        if (tags := self.__get_indexed(attribute, value, recursion_depth, sort)) is not None:
+            return tags[0] if tags else None
         return next((tag for tag in self.iter_tags(recursion_depth, sort) if tag.test_attr(attribute, value)), None)
 
     def get_filtered_all(self, attribute, value = None, recursion_depth = -1, sort = True):
@@ -214,20 +1295,234 @@ class XML():
         If value is None, returns all items that have the given attribute.
         Recursion depth determines up to how many levels deep the search should go. Set to < 0 for unlimited recursion.
         """
+        if (tags := self.__get_indexed(attribute, value, recursion_depth, sort)) is not None:
+            return tags
         return [tag for tag in self.iter_tags(recursion_depth, sort) if tag.test_attr(attribute, value)]
 
+    def build_index(self, attribute):
+        """
+        Creates an index of the values of the given attribute for all nested tags, such that get_filtered() / get_filtered_all() do not have to search the structure for this attribute anymore
+
+        The index is automatically rebuilt on the next lookup after the attribute of any nested tag has been modified, or nested tags have been added / removed anywhere in the structure.
+        Modifying tags outside the structure, or other attributes, does not affect the index.
+        Structures containing databases / attributes that have been assigned by the caller (see database) are searched again on every lookup instead, as these may be modified without the tags knowing.
+        """
+        if self._attribute_indices is None:
+            self._attribute_indices = {}
+        self._attribute_indices[attribute] = self.__build_index(attribute)
+
+    def __build_index(self, attribute):
+        """
+        Collects all nested tags with the given attribute (in tree order), together with their depth
+
+        All nested tags are registered with self (see _changing()), such that the index is discarded when any of them is modified.
+        returns: (dict, list, bool) - The tags grouped by value, all tags with the attribute, and whether the index may be kept (which is not the case if any of the databases / attributes have been assigned by the caller, see database).
+        """
+        values = {}
+        tags = []
+        tracked = type(self._database) is not list
+        assigned = _assigned_attributes if len(_assigned_attributes) else None
+        watch = ((weakref.ref(self), self._attribute_indices),) #Shared by all nested tags, unless they are registered with other tags as well
+        iterators = [iter(self._database)] #The iterators over the databases of the tags currently being searched; its length is the depth of the current tag.
+        while iterators:
+            for tag in iterators[-1]:
+                if isinstance(tag, XML):
+                    _register(tag, watch)
+                    if type(tag._database) is list or (assigned is not None and type(tag._attributes) is dict and assigned.get(tag) is tag._attributes):
+                        tracked = False
+                    if attribute in tag._attributes:
+                        entry = (len(iterators), tag)
+                        tags.append(entry)
+                        try:
+                            values.setdefault(tag._attributes[attribute], []).append(entry)
+                        except TypeError: #Unhashable values can only be found by value = None
+                            pass
+                    if tag._database:
+                        iterators.append(iter(tag._database))
+                        break
+            else:
+                iterators.pop()
+        return values, tags, tracked
+
+    def __get_indexed(self, attribute, value, recursion_depth, sort):
+        """
+        Returns all nested tags for which the value of "attribute" is equal to "value" using the attribute index
+
+        returns: list / NoneType - The matching tags, or None if no index is available for the given filter.
+        """
+        if not self._attribute_indices or not isinstance(attribute, str) or attribute not in self._attribute_indices or not (value is None or isinstance(value, str)):
+            return None
+        if self._attribute_indices[attribute] is None:
+            self._attribute_indices[attribute] = self.__build_index(attribute)
+        values, tags, tracked = self._attribute_indices[attribute]
+        if not tracked: #Rebuilt on the next lookup
+            self._attribute_indices[attribute] = None
+        if value is not None:
+            tags = values.get(value, ())
+        if recursion_depth >= 0:
+            tags = [entry for entry in tags if entry[0] <= recursion_depth]
+        if sort: #Sort by nesting level; Tags on the same level remain in tree order.
+            tags = sorted(tags, key = lambda entry: entry[0])
+        return [tag for depth, tag in tags]
+
     def find(self, name, recursion_depth = -1, sort = True):
         """
         Returns the first tag which has the given tag.name
         """
+        if recursion_depth == 1 or (recursion_depth and sort): #The first level can be looked up directly, as it is searched first
+            if tags := self.__index().get(name):
+                return tags[0]
+            elif recursion_depth == 1:
+                return None
         return next((tag for tag in self.iter_tags(recursion_depth, sort) if tag.name == name), None)
 
     def find_all(self, name, recursion_depth = -1, sort = True):
         """
         Returns all tags which have the given tag.name
         """
+        if recursion_depth == 1:
+            return list(self.__index().get(name, ()))
         return [tag for tag in self.iter_tags(recursion_depth, sort) if tag.name == name]
 
+    def select(self, query, default = None):
+        """
+        Returns the first result of a query (see iter_select()), or default if there are none
+
+        Only the parts of the structure that are required to find the first result are searched.
+        """
+        return next(self.iter_select(query), default)
+
+    def select_all(self, query):
+        """
+        Returns all results of a query (see iter_select())
+        """
+        return list(self.iter_select(query))
+
+    def iter_select(self, query):
+        """
+        Returns an iterator of the results of a query, in document order
+
+        The query is a path relative to this tag, consisting of location steps separated by "/" (children) or "//" (descendants), in a subset of XPath:
+            name / * - The tags with the given name / all tags.
+            . - The current tag(s); "//." selects the current tags and all their descendants.
+            [@attr] / [@attr='value'] / [@attr!='value'] - Only the tags that have / have the given / have another value for an attribute.
+            [name] - Only the tags that have a child tag with the given name.
+            [n] / [last()] - Only the n-th (1 based) / last of the matching tags of each parent.
+            @attr / text() - As last step; selects the value of an attribute / the text entries of the selected tags instead.
+        For example, "assembly[@id='x']/part" selects the "part" tags in the "assembly" tags with id "x", and ".//part[1]/@id" the id of each "part" tag that is the first "part" tag in its parent.
+
+        Compiled queries are cached. Only branches in which the query can still match are searched, and results are produced as they are found.
+        """
+        steps, value, descendants = _compile_query(query)
+        if not steps:
+            results = iter((self,))
+        else:
+            results = self.__iter_steps(steps)
+        if descendants:
+            results = self.__with_descendants(results)
+        if value is None:
+            yield from results
+        elif value[0] == "attribute":
+            yield from (tag._attributes[value[1]] for tag in results if value[1] in tag._attributes)
+        else:
+            for tag in results:
+                yield from (entry for entry in tag._database if isinstance(entry, str) and not (len(entry) >= 7 and entry.startswith("<!--") and entry.endswith("-->")))
+
+    @staticmethod
+    def __with_descendants(tags):
+        """
+        Returns an iterator of the given tags (in document order), each followed by its descendants, in document order
+
+        Tags that are nested in a preceding tag are only returned once, as its descendant.
+        """
+        nested = set() #The ids of the descendants of the last returned tag
+        for tag in tags:
+            if id(tag) in nested:
+                continue
+            yield tag
+            nested = set()
+            for descendant in tag.__iter_steps(((True, None, None, ()),)): #As for ".//*"
+                nested.add(id(descendant))
+                yield descendant
+
+    def __iter_steps(self, steps):
+        """
+        Returns an iterator of the tags matched by compiled query steps, in document order
+
+        The structure is searched depth first. For every tag, the steps that still have to be applied to its children are tracked, and tags for which there are none are not searched at all.
+        """
+        stack = [self.__match_steps(steps, (0,))]
+        while stack:
+            for tag, matched, pending in stack[-1]:
+                if matched:
+                    yield tag
+                if pending and tag._database:
+                    stack.append(tag.__match_steps(steps, pending))
+                    break
+            else:
+                stack.pop()
+
+    def __match_steps(self, steps, pending):
+        """
+        Applies the given (pending) query steps to the children of the tag
+
+        returns: iterator - (tag, matched, pending) for each child that either matches the final step, or has steps pending (in document order).
+        """
+        last = len(steps) - 1
+        descendant = tuple(step for step in pending if steps[step][0]) #Steps that are passed on to all children
+        if not descendant and len(pending) == 1: #Only the children matching the step have to be considered
+            step = pending[0]
+            following = (step + 1,) if step < last else ()
+            #The name index is only used if it is available anyway, or for the tag the query started from; building it for every searched tag would cost more than it saves.
+            indexed = self._index is not None or step == 0
+            return ((tag, step == last, following) for tag in self.__match_step(steps[step], indexed))
+        filtered = {step: {id(tag) for tag in self.__match_step(steps[step])} for step in pending if steps[step][3]} #Positional predicates require all matching children at once
+        if len(pending) == 1 and not filtered: #A single descendant step, e.g. "//name"
+            step = pending[0]
+            _, name, test, _ = steps[step]
+            following = (step, step + 1) if step < last else descendant
+            return ((tag, step == last, following) if name in (None, tag._name) and (test is None or test(tag)) else (tag, False, descendant) for tag in self._database if isinstance(tag, XML))
+        return self.__match_children(steps, pending, descendant, filtered)
+
+    def __match_children(self, steps, pending, descendant, filtered):
+        """
+        Applies multiple query steps to the children of the tag, while passing on the steps for descendants
+        """
+        last = len(steps) - 1
+        for tag in self._database:
+            if isinstance(tag, XML):
+                matched = False
+                following = descendant
+                for step in pending:
+                    if step in filtered:
+                        if id(tag) not in filtered[step]:
+                            continue
+                    elif steps[step][1] not in (None, tag._name) or (steps[step][2] is not None and not steps[step][2](tag)):
+                        continue
+                    if step == last:
+                        matched = True
+                    elif step + 1 not in following:
+                        following += (step + 1,)
+                if matched or following:
+                    yield tag, matched, following
+
+    def __match_step(self, step, indexed = False):
+        """
+        Returns the children matching a single compiled query step
+        """
+        _, name, test, filters = step
+        if name is None:
+            tags = [tag for tag in self._database if isinstance(tag, XML)]
+        elif indexed:
+            tags = self.__index().get(name, ())
+        else:
+            tags = [tag for tag in self._database if isinstance(tag, XML) and tag._name == name]
+        if test is not None:
+            tags = [tag for tag in tags if test(tag)]
+        for filter in filters:
+            tags = filter(tags)
+        return tags
+
     def iter_database(self, recursion_depth = -1, sort = True):
         """
         Returns an iterator of all items in the database, up to the specified depth
@@ -236,17 +1531,17 @@ class XML():
         If sort is True, all items are returned sorted based on their nesting level. Else, all items are returned in a tree / branch order.
         """
         if sort: #Sorted generator (level wise)
-            database = self.database
+            database = self._database
             while database and recursion_depth:
                 yield from database
-                database = tuple(it.chain.from_iterable([tag.database for tag in database if isinstance(tag, XML)]))
+                database = tuple(it.chain.from_iterable([tag._database for tag in database if isinstance(tag, XML)]))
                 recursion_depth -= 1
 
-        else: #"Unsorted" generator (branch-wise)
-            for tag in self.database:
+        elif recursion_depth: #"Unsorted" generator (branch-wise)
+            for tag in self._database:
                 yield tag
-                if isinstance(tag, XML) and recursion_depth:
-                    yield from tag._iter_database(0, recursion_depth - 1, False)
+                if isinstance(tag, XML) and recursion_depth != 1:
+                    yield from tag.iter_database(recursion_depth - 1, False)
 
     def iter_tags(self, recursion_depth = -1, sort = True):
         """
@@ -262,7 +1557,7 @@ class XML():
         """
         Returns all XML tags contained in the database
         """
-        return tuple(tag for tag in self.database if isinstance(tag, XML))
+        return tuple(tag for tag in self._database if isinstance(tag, XML))
 
     @property
     def max_depth(self):
@@ -274,17 +1569,29 @@ class XML():
         else:
             return 0
 
-    def copy(self, deepcopy = False):
+    def copy(self, deepcopy = False, copy_on_write = False):
         """
         Returns a copy of self
 
         deepcopy: bool - Determines whether nested tags should also be copied, or whether the original nested tag should be used in the new database. If false, a shallow copy will be performed.
+        copy_on_write: bool - If True (and deepcopy is True), the nested tags are copied on demand instead: each nested tag of the copy shares the database and attributes of the original tag, until it is modified or its nested tags are accessed. Only then does that tag get its own database (with its nested tags again being shared) and attributes.
+            This way, copying takes time and memory proportional to the parts of the copy that are used, instead of to the size of the entire structure. Writing the copy (write(), tostring(), ...) reads the original directly.
+            Modifying the copy never affects the original, and vice versa: tags of the original that are modified afterwards keep their previous state for as long as the copy is alive. This takes time proportional to the modified tag only, not to the size of the copied structure. Tags that are not part of any copied structure never keep their state.
+            To tell these apart, the first copy of a structure marks all of its tags once; later copies only check the nested tags of self. Lists / dicts that have been assigned by the caller (see database) are replaced by copies of their own while marking, so modifying these directly no longer affects the tags.
         Note: deepcopy only applies to nested tags. The database / attributes will always be a separate object.
         """
-        if deepcopy:
-            return XML(self.name, [tag.copy(True) if isinstance(tag, XML) else tag for tag in self.database], self.attributes.copy(), self.format)
+        if deepcopy and copy_on_write:
+            database = self._database
+            _track(database)
+            epoch = _Epoch()
+            copy = XML(self.name, tuple(_Shared.of(tag, epoch) if isinstance(tag, XML) else tag for tag in database) if database else None, None, self._format)
+        elif deepcopy:
+            copy = XML(self.name, (tag.copy(True) if isinstance(tag, XML) else tag for tag in self._database) if self._database else None, None, self._format)
         else:
-            return XML(self.name, self.database.copy(), self.attributes.copy(), self.format)
+            copy = XML(self.name, tuple(self._database) if self._database else None, None, self._format)
+        if self._attributes:
+            copy._attributes = dict(self._attributes) #Set directly, as the copy is not shared with the caller (unlike a dict passed to XML())
+        return copy
 
     def deepcopy(self):
         """
@@ -292,6 +1599,35 @@ class XML():
         """
         return self.copy(True)
 
+    def _clone(self):
+        """
+        Returns a deep copy of self that is identical in every respect, including the class and XML declaration of every tag (unlike copy(True))
+        """
+        def clone(tag):
+            database = tag._database #Parses unparsed tags first, which also restores their class
+            copy = object.__new__(type(tag))
+            copy._name = tag._name
+            copy._attributes = tag._attributes.copy() if tag._attributes else _empty_attributes
+            copy._format = tag._format
+            copy._declaration = tag._declaration
+            copy._index = None
+            copy._attribute_indices = None
+            copy._watch = None
+            copy._history = None
+            return copy, database
+        root, database = clone(self)
+        stack = [(root, database)]
+        while stack:
+            copy, database = stack.pop()
+            entries = []
+            for entry in database:
+                if isinstance(entry, XML):
+                    entry, nested = clone(entry)
+                    stack.append((entry, nested))
+                entries.append(entry)
+            copy._database = tuple(entries)
+        return root
+
     def reduce(self, recursion_depth = -1, reduce_multiline = True):
         """
         Tries to minimise the number of nested tags by turning tags which only contain a single string value into an attribute instead
@@ -299,24 +1635,33 @@ class XML():
         recursion_depth: int - The depth of children that should also attempt to reduce().
         reduce_multiline: Bool - Determines whether multi-line text should be reduced as well.
         """
-        for tag in reversed(tuple(self.iter_tags(recursion_depth))):
-            # Reduce the tags, but don't make them recursively call reduce on their children. All recursion is already done in iter_tags().
+        for tag in self.__iter_tags_bottom_up(recursion_depth):
+            # Reduce the tags, but don't make them recursively call reduce on their children. All recursion is already done here, children first.
             tag.reduce(0)
-        tag_names = [tag.name for tag in self.tags]
-        tag_count = len(self.database)
-        for tag_num, tag in list(enumerate(self.database)):
-            if not isinstance(tag, XML): # Make sure text is not compressed (because it can't be)
-                continue
+        tag_names = None
+        database = []
+        reduced = []
+        attributes = self._attributes
+        for tag in self._database:
+            if tag_names is None and isinstance(tag, XML):
+                tag_names = self.__index()
             # Checks:
             # Must contain only one items
             # Contained item must be string
             # String must not contain any newline
             # Tag name must not occur multiple times (prevent preferenatial treatment)
             # Tag name must not exist yet in attributes (prevent overwriting existing attributes)
-            if not tag.attributes and len(tag.database) == 1 and isinstance(tag.database[0], str) and (not "\n" in tag.database[0] or reduce_multiline) and tag_names.count(tag.name) == 1 and not tag.name in self.attributes:
-                self.attributes[tag.name] = tag.database[0]
-                # Note: Reverse indexing used to circumvent index shift when removing items at the start
-                self.database.pop(-tag_count + tag_num)
+            if isinstance(tag, XML) and not tag._attributes and len(tag._database) == 1 and isinstance(tag._database[0], str) and (not "\n" in tag._database[0] or reduce_multiline) and len(tag_names[tag.name]) == 1 and not tag.name in attributes:
+                reduced.append(tag)
+            else:
+                database.append(tag)
+        if reduced: #The tag is only modified (and any indices discarded) if anything is reduced
+            self._changing(True)
+            attributes = self.__mutable_attributes()
+            for tag in reduced:
+                dict.__setitem__(attributes, tag.name, tag._database[0])
+                del tag_names[tag.name]
+            list.__setitem__(self.__mutable_database(), slice(None), database) #Rebuild the database once (in place, as it may be kept by the caller), instead of removing the reduced tags one by one
 
     def expand(self, recursion_depth = -1, force_expand = False):
         """
@@ -325,13 +1670,39 @@ class XML():
         recursion_depth: int - The depth of children that should also attempt to expand().
         force_expand: Bool - Determines whether the expansion should expand attributes if a nested tag with the same name already exists.
         """
-        for tag in self.iter_tags(recursion_depth):
+        for tag in self.__iter_tags_bottom_up(recursion_depth):
             tag.expand(0, force_expand)
         # Get the tag names to be used to prevent name collisions (if required)
-        tag_names = [tag.name for tag in self.tags]
-        for tag in list(self.attributes):
-            if force_expand or tag not in tag_names:
-                self.append(XML(tag, database = [self.attributes.pop(tag)]))
+        tag_names = self.__index()
+        if expanded := [name for name in self._attributes if force_expand or name not in tag_names]:
+            self._changing(True)
+            database = self.__mutable_database()
+            for name in expanded:
+                tag = XML(name, database = (dict.pop(self._attributes, name),))
+                list.append(database, tag)
+                tag_names.setdefault(name, []).append(tag)
+                _register(tag, ((weakref.ref(self), tag_names),))
+            if self._history is not None:
+                _track(database)
+
+    def __iter_tags_bottom_up(self, recursion_depth = -1):
+        """
+        Returns an iterator of all nested tags up to a depth of 'recursion_depth' (like iter_tags()), in which all tags come after their nested tags
+        """
+        stack = [(self, iter(self._database), recursion_depth)] if recursion_depth else []
+        while stack:
+            tag, entries, depth = stack[-1]
+            for entry in entries:
+                if isinstance(entry, XML):
+                    if depth == 1:
+                        yield entry
+                    else:
+                        stack.append((entry, iter(entry._database), depth - 1))
+                        break
+            else:
+                stack.pop()
+                if stack:
+                    yield tag
 
     def set_format(self, format, recursion_depth = 0):
         """
@@ -340,86 +1711,205 @@ class XML():
         format: str - The format the tag should get. Should be either "auto", "long" or "short".
         """
         if format.lower() in ("auto", "long", "short"):
-            self.format = format.lower()
-            for tag in self.iter_tags(recursion_depth):
-                tag.set_format(format)
+            self.format = sys.intern(format.lower())
+            if recursion_depth:
+                for tag in self.iter_tags(recursion_depth):
+                    tag.set_format(format)
         else:
             raise ValueError(f"Invalid tag format '{format}'")
 
-    def write(self, file, allow_compact = True, depth = 0):
+    def write(self, file, allow_compact = True, depth = 0, stats = None):
         """
         Write the XML structure to a given file
 
-        file: string / filepath - The path to the file the XML should be stored to.
+        file: string / filepath / file object - The path to the file the XML should be stored to, or an (opened) file to write to.
         allow_compact: bool - Determines whether XML tags containing only a single text based database entry are allowed to be written as a single line tag, instead of taking up three lines.
         depth: int - The indentation (in '  ') the XML tag should have by default.
+        stats: XMLStats / NoneType - If given, statistics of the written structure (size, number of tags and time) are added to it.
         """
         if not hasattr(file, "write"):
             with open(file, "w", encoding = "utf-8-sig") as f:
-                f.write('<?xml version="1.0" encoding="utf-8"?>\n') #Write the XML header
-                self.write(f, allow_compact, depth) #Write the contents of the tag(s) to the (now opened) file
+                f.write(_xml_declaration) #Write the XML header
+                self.write(f, allow_compact, depth, stats) #Write the contents of the tag(s) to the (now opened) file
+                if stats is not None:
+                    f.flush()
+                    stats.bytes_written += os.fstat(f.fileno()).st_size
         else:
-            file.write(f"{depth * '  '}{self.header}")
-            if  allow_compact and len(self.database) == 1 and not isinstance(self.database[0], XML):
-                file.write(f"{self.encode(self.database[0], True)}")
+            if stats is not None:
+                start = time.perf_counter()
+            #Collect the output in larger chunks, to minimise the number of write calls
+            chunk = []
+            size = 0
+            for string in self.serialize(allow_compact, depth):
+                chunk.append(string)
+                if len(chunk) >= 4096:
+                    string = "".join(chunk)
+                    size += len(string)
+                    file.write(string)
+                    chunk.clear()
+            string = "".join(chunk)
+            file.write(string)
+            if stats is not None:
+                stats._add_write(self, size + len(string), time.perf_counter() - start)
+
+    def tostring(self, allow_compact = True, depth = 0, declaration = False, stats = None):
+        """
+        Returns the XML structure as string, exactly as it would be written by write()
+
+        declaration: bool - Determines whether the XML declaration (<?xml ...?>) should be included at the start of the string.
+        stats: XMLStats / NoneType - See write().
+        """
+        if stats is not None:
+            start = time.perf_counter()
+        string = "".join(self.serialize(allow_compact, depth))
+        if stats is not None:
+            stats._add_write(self, len(string), time.perf_counter() - start)
+        return _xml_declaration + string if declaration else string
+
+    def to_bytes(self, encoding = "utf-8", allow_compact = True, depth = 0, declaration = False, stats = None):
+        """
+        Returns the XML structure as bytes, encoded using the given encoding
+
+        declaration: bool - Determines whether the XML declaration (<?xml ...?>), naming the given encoding, should be included at the start of the data.
+        stats: XMLStats / NoneType - See write().
+        """
+        string = self.tostring(allow_compact, depth, False, stats)
+        if declaration:
+            declared = "utf-8" if codecs.lookup(encoding).name == "utf-8-sig" else encoding #Preceded by a byte order mark, the data is still UTF-8 (as written by write())
+            string = _declaration_template.format(declared) + string
+        data = string.encode(encoding)
+        if stats is not None:
+            stats.bytes_written += len(data)
+        return data
+
+    def to_binary(self, file = None):
+        """
+        Stores the XML structure as binary snapshot, which can be loaded (much faster than parsing the XML) using XML.from_binary()
+
+        The snapshot contains everything about the tags (names, attributes, databases including comments, formats and XML declarations). Tag and attribute names are stored only once each, in a table.
+        Attribute values and database entries are stored as is, so besides strings only int, float, bool and None values are supported. Tag and attribute names have to be strings; other names (or values) raise a TypeError.
+        The format is independent of the Python version, and all strings are stored as UTF-8. The structure and the lengths of the values are stored with as few bytes per item as they fit in (usually a single byte). Snapshots include a checksum; corrupt (or otherwise invalid) snapshots raise a ValueError when loaded.
+        file: string / filepath / file object / NoneType - The path to the file the snapshot should be stored to, or an (opened, binary) file to write to. If None, the snapshot is returned as bytes instead.
+        """
+        names = {} #{name: index + 2} of the tag and attribute names (see from_binary())
+        codes = array("I")
+        strings = []
+        stack = [(iter((self,)), None)] #For all opened tags: (iterator over the remaining database entries, copy the entries are read for (see _view()))
+        while stack:
+            entries, epoch = stack[-1]
+            for entry in entries:
+                if not isinstance(entry, XML):
+                    codes.append(0)
+                    strings.append(entry)
+                    continue
+                name, format, attributes, database, nested = entry._view(epoch) #Parses unparsed tags first
+                if not isinstance(name, str):
+                    raise TypeError(f"Tag names of type '{type(name).__name__}' cannot be stored in a binary snapshot")
+                codes.append(names.setdefault(name, len(names) + 2))
+                if entry._declaration is not None and epoch is None:
+                    codes.append(_binary_formats.index(format) | 4)
+                    strings.extend(entry._declaration)
+                else:
+                    codes.append(_binary_formats.index(format))
+                codes.append(len(attributes))
+                for attr, value in attributes.items():
+                    if not isinstance(attr, str):
+                        raise TypeError(f"Attribute names of type '{type(attr).__name__}' cannot be stored in a binary snapshot")
+                    codes.append(names.setdefault(attr, len(names) + 2))
+                    strings.append(value)
+                stack.append((iter(database), nested))
+                break #Continue with the database of the tag first
             else:
-                file.write("\n")
-                for child in self.database:
-                    if isinstance(child, XML):
-                        child.write(file, allow_compact, depth + 1)
-                    else:
-                        file.write(f"{(depth + 1) * '  '}{self.encode(child.replace(chr(10), chr(10) + (depth + 1) * '  '), True)}\n")
-                if self.format == "long" or (self.format == "auto" and self.database):
-                    file.write(f"{depth * '  '}")
-            if self.format == "long" or (self.format == "auto" and self.database):
-                file.write(f"</{self.name}>\n")
+                stack.pop()
+                if stack:
+                    codes.append(1)
+        codes = _pack_array(codes)
+        lengths, text, extra_count, extras = _pack_values([*names, *strings])
+        data = b"".join((codes.tobytes(), lengths.tobytes(), text, extras))
+        data = _binary_header.pack(_binary_magic, _binary_version, zlib.crc32(data), codes.itemsize, lengths.itemsize, len(codes), len(names), len(strings), len(text), extra_count) + data
+        if file is None:
+            return data
+        elif not hasattr(file, "write"):
+            with open(file, "wb") as f:
+                f.write(data)
+        else:
+            file.write(data)
 
+    def serialize(self, allow_compact = True, depth = 0):
+        """
+        Returns an iterator over the pieces of text that together form the written XML structure
+
+        The structure is traversed iteratively, so (unlike recursion) deeply nested structures can be written as well.
+        See write() for the meaning of the arguments.
+        """
+        encode = self.encode
+        stack = [(iter((self,)), depth * "  ", "", None)] #For all opened tags: (iterator over the remaining database entries, indent of the entries, closing tag, copy the entries are read for (see _view()))
+        while stack:
+            entries, indent, closing, epoch = stack[-1]
+            for child in entries:
+                if not isinstance(child, XML):
+                    yield f"{indent}{encode(child.replace(chr(10), chr(10) + indent), True)}\n"
+                    continue
+                name, format, attributes, database, nested = child._view(epoch)
+                yield f"{indent}{child._header(format == 'short' or (format == 'auto' and not database), name, attributes)}"
+                closes = format == "long" or (format == "auto" and database)
+                if allow_compact and len(database) == 1 and not isinstance(database[0], XML):
+                    yield encode(database[0], True)
+                    if closes:
+                        yield f"</{name}>\n"
+                else:
+                    yield "\n"
+                    stack.append((iter(database), indent + "  ", f"{indent}</{name}>\n" if closes else "", nested))
+                    break #Continue with the database of the child first
+            else:
+                stack.pop()
+                if closing:
+                    yield closing
 
     @property
     def header(self):
         """
         Builds the header string for writing the XML tag to a file
         """
-        string = f"<{self.name}"
-        for attr in self.attributes:
-            value = str(self.attributes[attr]) #Turn the value into a string, without any " surrounding it.
-            string = " ".join([string, f'{attr}="{self.encode(value)}"'])
-        if self.format == "short" or (self.format == "auto" and not self.database): #If the tag is of the short format, add the "/" to the end to signify this.
-            string = string + "/"
-        string = string + ">"
-        return string
+        return self._header(self._format == "short" or (self._format == "auto" and not self._database))
+
+    def _header(self, short, name = None, attributes = None):
+        """
+        Builds the header string of the tag, ending in "/>" if short is True (for the short format), or ">" otherwise
+
+        name / attributes: The name and attributes to write instead of those of the tag, such as those read by _view().
+        """
+        if name is None:
+            name, attributes = self._name, self._attributes
+        #Attribute values are turned into a string, without any " surrounding it.
+        string = " ".join([f"<{name}", *(f'{attr}="{self.encode(str(value))}"' for attr, value in attributes.items())])
+        if short: #If the tag is of the short format, add the "/" to the end to signify this.
+            return string + "/>"
+        return string + ">"
 
     def __split_str(string):
         """
         Splits a string at every " and ', but only if those characters are not in a string delimited by the other type of string symbol
         """
         out = []
-        while '"' in string or "'" in string: # While there are more attributes in the string
-            try:
-                if 0 <= string.find('"') < string.find("'") or string.find("'") == -1: # If " comes before ':
-                    attr, value, string = string.split('"', 2) # Split off the first attr
-                else:
-                    attr, value, string = string.split("'", 2)
-            except ValueError: # In case a closing character cannot be found:
-                raise EOFError(f"Unclosed attribute value string: '{string}'")
-            out.append((attr, value))
+        index = 0
+        double = string.find('"') #Position of the next " and ' respectively; only searched again once they have been passed.
+        single = string.find("'")
+        while double >= 0 or single >= 0: # While there are more attributes in the string
+            if double < index and double >= 0:
+                double = string.find('"', index)
+            if single < index and single >= 0:
+                single = string.find("'", index)
+            if double < 0 and single < 0:
+                break
+            start = double if 0 <= double < single or single == -1 else single # Use whichever of " and ' comes first
+            end = string.find(string[start], start + 1)
+            if end < 0: # In case a closing character cannot be found:
+                raise EOFError(f"Unclosed attribute value string: '{string[index:]}'")
+            out.append((string[index:start], string[start + 1:end]))
+            index = end + 1
         return out
 
-    def __in_str(string, index):
-        """
-        Tests if a character / index is inside a 'string' (section delimited by quotation marks)
-
-        Returns True if in a string, False otherwise.
-        """
-        search_index = 0
-        while True:
-            search_index = min((i for i in [string.find('"', search_index), string.find("'", search_index)] if i >= 0), default = -1) # Search for the opening quotation
-            if search_index == -1 or index <= search_index: # If no opening quotation is present at all, or the index was before opening quotation:
-                return False
-            search_index = string.find(string[search_index], search_index + 1) + 1 # Search for the closing quotation (which has to be the same char as the opening quotation)
-            if search_index == 0 or index < search_index: # If either no closing quotation was found, or the index is before the closing quotation:
-                return True
-
     @staticmethod
     def encode(string, ignore_comment = False):
         """
@@ -427,11 +1917,14 @@ class XML():
 
         Note: It is not required (nor recommended) to pass the encoded string as the value for an attribute / database entry. Doing this anyway will lead to the strings being double-encoded, since the strings are automatically encoded during saving / writing.
         """
+        #Most strings do not contain any of the characters at all; testing for them is much faster than replacing them.
+        if not ("&" in string or "<" in string or ">" in string or '"' in string or "'" in string):
+            return string
         if ignore_comment and len(string) >= 7 and string.startswith("<!--") and string.endswith("-->"):
             return string
-        chars = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&apos;"}
-        for char, encoded in chars.items():
-            string = string.replace(char, encoded)
+        for char, encoded in _encoded_chars:
+            if char in string:
+                string = string.replace(char, encoded)
         return string
 
     @staticmethod
@@ -439,14 +1932,621 @@ class XML():
         """
         Decodes a string such that all escaped characters are replaced with their original characters
 
+        Both the named escape sequences (&amp; &lt; &gt; &quot; &apos;) and numeric character references (&#NNN; / &#xHH;) are decoded.
         Note: It is not required (nor recommended) to call this function on the database entries / attribute values in the XML structure, as all strings are automatically decoded during parsing.
         """
-        #Replace all "alternative" escape sequences with a singular "base" case, which can then be more easily replaced using str.replace, without having to worry about accidentally double-decoding a string / character.
-        alts = {"&#38;": "&amp;", "&#60;": "&lt;", "&#62;": "&gt;", "&#34;": "&quot;", "&#39;": "&apos;"}
-        for alt, base in alts.items():
-            string = string.replace(alt, base)
+        if "&" not in string:
+            return string
+        #Numeric references to escaped characters are turned into the "base" case, which can then be more easily replaced using str.replace, without having to worry about accidentally double-decoding a string / character.
+        if "&#" in string:
+            string = _numeric_reference.sub(_decode_numeric_reference, string)
         #Replace the base escape sequences with their unencoded value
-        chars = {"&apos;": "'", "&quot;": '"', "&gt;": ">", "&lt;": "<", "&amp;": "&"}
-        for encoded, char in chars.items():
-            string = string.replace(encoded, char)
+        for encoded, char in _decoded_chars:
+            if encoded in string:
+                string = string.replace(encoded, char)
         return string
+
+def _parse_chunk(tag_class, chunk, closer, include_comments, count_skipped = False):
+    """
+    Parses a chunk of the body of a tag in a worker process (see XML._parse_parallel())
+
+    closer: str / NoneType - The closing tag sequence of the tag, or None for the first chunk (which includes the header of the tag).
+    count_skipped: bool - Whether the comments skipped in the chunk should be counted.
+
+    The tag is transferred as binary snapshot (see XML.to_binary()) rather than pickled, as pickling recurses into the nested tags, which fails for deeply nested documents.
+    returns: (bytes, int) - The snapshot of the tag (or, for other chunks, of a tag containing the entries of the chunk), and the number of skipped comments (if counted).
+    """
+    stats = XMLStats(timings = False) if count_skipped else None
+    if closer is None:
+        tag = tag_class._parse(chunk, 0, include_comments, stats = stats)[0]
+    else:
+        tag = tag_class()
+        tag._database = []
+        tag_class._parse(chunk, 0, include_comments, None, [[tag, closer, None, True]], stats = stats)
+    return tag.to_binary(), stats.comments_skipped if stats is not None else 0
+
+def _load_file(tag_class, filepath, include_comments, snapshot):
+    """
+    Loads a file in a worker thread / process (see XML.load_many())
+
+    snapshot: bool - Whether the tag should be returned as binary snapshot (see XML.to_binary()), to be loaded by XML.from_binary() instead of being pickled by the executor. Unlike pickling, this does not recurse into the nested tags (which fails for deeply nested files), and loads faster.
+    """
+    tag = tag_class.XMLFile(filepath, include_comments)
+    return tag.to_binary() if snapshot else tag
+
+_database_slot = XML._database #The underlying storage of the database, bypassing the properties of unparsed tags
+_index_slot = XML._index #The underlying storage of the name index, bypassing the properties of shared tags
+
+class _Source():
+    """
+    The location of an unparsed tag in its source string
+    """
+    __slots__ = ("data", "start", "end", "name", "include_comments")
+
+    def __init__(self, data, start, end, name, include_comments):
+        self.data = data
+        self.start = start #The index of the header of the tag
+        self.end = end #The index of the closing tag (or the end of the header, for short tags)
+        self.name = name #The name of the tag in the source, even if it has been renamed since
+        self.include_comments = include_comments
+
+class _Unparsed():
+    """
+    Mixin for tags that have been located by XML._scan(), but not parsed yet
+
+    The source of the tag is stored in place of its database. As soon as the database or attributes are accessed in any way, the tag is parsed and turned into an instance of its regular class.
+    As all methods of XML only use these through _database / _attributes, unparsed tags behave exactly the same as parsed ones.
+    """
+    __slots__ = ()
+    _variants = {} #The unparsed variant of every tag class: {cls: variant}
+
+    @classmethod
+    def variant(cls, tag_class):
+        """
+        Returns the unparsed variant of a (subclass of) XML
+        """
+        if (variant := cls._variants.get(tag_class)) is None:
+            variant = cls._variants[tag_class] = type(f"Unparsed{tag_class.__name__}", (cls, tag_class), {"__slots__": (), "__module__": tag_class.__module__, "__qualname__": f"Unparsed{tag_class.__qualname__}", "_tag_class": tag_class})
+        return variant
+
+    def __parse(self):
+        source = _database_slot.__get__(self)
+        tag, _ = self._tag_class._parse(source.data, source.start, source.include_comments, {f"</{source.name}": source.end}, lazy = True)
+        for entry in tag._database: #The nested tags are as old as the tag itself, and part of the same copied structures (if any), so that the copies made since keep their states as well (see XML._changing())
+            if isinstance(entry, XML):
+                entry._history = self._history
+        self.__class__ = self._tag_class
+        self._database = tag._database
+        self._attributes = tag._attributes
+
+    def __reduce_ex__(self, protocol): #Pickle / copy as a parsed tag
+        self.__parse()
+        return self.__reduce_ex__(protocol)
+
+    @property
+    def _database(self):
+        self.__parse()
+        return self._database
+
+    @_database.setter
+    def _database(self, database):
+        self.__parse()
+        self._database = database
+
+    @property
+    def _attributes(self):
+        self.__parse()
+        return self._attributes
+
+    @_attributes.setter
+    def _attributes(self, attributes):
+        self.__parse()
+        self._attributes = attributes
+
+class _Epoch():
+    """
+    A copy made by XML.copy(True, copy_on_write = True), which is alive for as long as any of its tags still share their state with the original (see _Shared)
+
+    Tags that existed when the copy was made keep their previous state in the copy when they are modified (see XML._changing()). The states are kept weakly keyed by their tags, so that they are freed along with the tag or the copy, whichever comes first.
+    """
+    __slots__ = ("number", "states", "__weakref__")
+    live = [] #The (number, weak reference) of the copies that may still be alive, oldest first
+    limit = 64 #The number of copies in live at which the copies that are no longer alive are discarded
+
+    def __init__(self):
+        XML._copies += 1
+        self.number = XML._copies
+        self.states = weakref.WeakKeyDictionary() #The states of the tags as they were when the copy was made, if they have been modified since: {tag: (name, format, attributes, database)}
+        live = _Epoch.live
+        live.append((self.number, weakref.ref(self)))
+        if len(live) >= _Epoch.limit:
+            _Epoch.live = [entry for entry in live if entry[1]() is not None]
+            _Epoch.limit = max(64, 2 * len(_Epoch.live))
+
+class _Shared(XML):
+    """
+    Nested tag of a copy made by XML.copy(True, copy_on_write = True), which still shares its database and attributes with the original tag
+
+    The original tag and the copy (_Epoch) are stored in place of the database and name index; the state of the original is read as it was when the copy was made (see _Epoch.states).
+    As soon as the database or attributes are accessed in any way, the tag gets a database and attributes of its own (with the nested tags being shared copies in turn), and is turned into a regular XML tag.
+    As with unparsed tags, this makes shared copies behave exactly the same as regular copies. Reading without accessing the tags themselves (such as writing) uses XML._view() instead, which does not create any tags.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, tag, epoch):
+        """
+        Returns a shared copy of a tag, as it was when the given copy was made
+        """
+        state = epoch.states.get(tag)
+        copy = object.__new__(cls)
+        copy._name, copy._format = state[:2] if state else (tag._name, tag._format)
+        copy._declaration = None
+        copy._attribute_indices = None
+        copy._watch = None
+        copy._history = None
+        _database_slot.__set__(copy, tag)
+        _index_slot.__set__(copy, epoch)
+        return copy
+
+    def __unshare(self):
+        _, _, attributes, database, epoch = _database_slot.__get__(self)._view(_index_slot.__get__(self))
+        self.__class__ = XML
+        self._index = None
+        self._database = tuple(_Shared.of(tag, epoch) if isinstance(tag, XML) else tag for tag in database)
+        for entry in self._database: #The nested tags are as old as the tag itself, and part of the same copied structures (if any), so that the copies made since keep their states as well (see XML._changing())
+            if isinstance(entry, XML):
+                entry._history = self._history
+        self._attributes = attributes if attributes is _empty_attributes else dict(attributes)
+
+    def __reduce_ex__(self, protocol): #Pickle / copy as a regular tag
+        self.__unshare()
+        return self.__reduce_ex__(protocol)
+
+    @property
+    def _database(self):
+        self.__unshare()
+        return self._database
+
+    @_database.setter
+    def _database(self, database):
+        self.__unshare()
+        self._database = database
+
+    @property
+    def _attributes(self):
+        self.__unshare()
+        return self._attributes
+
+    @_attributes.setter
+    def _attributes(self, attributes):
+        self.__unshare()
+        self._attributes = attributes
+
+    @property
+    def _index(self):
+        self.__unshare()
+        return self._index
+
+    @_index.setter
+    def _index(self, index):
+        self.__unshare()
+        self._index = index
+
+class XMLParser():
+    """
+    Incremental (push) parser, for XML data that arrives in pieces
+
+    Pass the data to feed() as it arrives, and call close() once all data has been passed to obtain the parsed XML structure.
+    The resulting structure is identical to the one XML.from_str() produces for the concatenated data. Any data after the first complete tag is ignored.
+    """
+    def __init__(self, include_comments = False, events = (), tag_class = XML):
+        """
+        include_comments: bool - Determines whether comments should be included in the database of the tags.
+        events: iterable - The events ("start" and / or "end") that should be reported by read_events().
+        tag_class: type - The (sub)class of XML the tags should be created as.
+        """
+        self.events = tuple(events)
+        for event in self.events:
+            if event not in ("start", "end"):
+                raise ValueError(f"Invalid event '{event}'")
+        self.include_comments = include_comments
+        self.tag_class = tag_class
+        self.root = None #The parsed XML structure, once it has been completed
+        self._data = "" #The data that could not be parsed yet
+        self._chunks = [] #The data fed since the last parsing attempt
+        self._waiting = 0 #The amount of data required before another parsing attempt is made
+        self._stack = []
+        self._events = [] if self.events else None
+        self._closed = False
+
+    def feed(self, data):
+        """
+        Parses a piece of data, continuing where the previous piece ended
+        """
+        if self._closed:
+            raise ValueError("Cannot feed data to a closed parser")
+        if self.root is not None:
+            return
+        self._chunks.append(data)
+        self._waiting -= len(data)
+        if self._waiting <= 0:
+            self.__parse(False)
+
+    def close(self):
+        """
+        Finishes parsing the fed data, and returns the parsed XML structure
+
+        Raises the same errors as XML.from_str() if the data does not contain a complete XML structure.
+        """
+        if not self._closed:
+            self._closed = True
+            if self.root is None:
+                self.__parse(True)
+        return self.root
+
+    def read_events(self):
+        """
+        Returns an iterator over the (event, tag) pairs that were produced since the last call
+        """
+        events, self._events = self._events, [] if self._events is not None else None
+        for event in events or ():
+            if event[0] in self.events:
+                yield event
+
+    def __parse(self, final):
+        """
+        Parses as much of the unparsed data as possible
+        """
+        data = self._data + "".join(self._chunks)
+        self._chunks.clear()
+        self.root, pos = self.tag_class._parse(data, 0, self.include_comments, None, self._stack, self._events, final)
+        self._data = data[pos:] if self.root is None else ""
+        #Incomplete parts are only retried once the amount of unparsed data has doubled, preventing large text values from being rescanned for every chunk.
+        self._waiting = len(self._data)
+
+class XMLWriter():
+    """
+    Writes an XML structure to a file incrementally, without building the entire structure in memory first
+
+    Tags are opened with start() (or element()) and closed with end(); completed XML tags and text can be written in between using write(). For example:
+        with XMLWriter("export.xml") as writer:
+            with writer.element("records", {"version": "2"}):
+                for record in records:
+                    writer.write(record)
+    The output is identical to that of XML.write() for the equivalent structure. Only the opened tags (and at most one text entry per tag) are kept in memory.
+    """
+    def __init__(self, file, allow_compact = True, depth = 0):
+        """
+        file: string / filepath / file object - The path to the file the XML should be stored to (including the XML declaration), or an (opened) file to write to.
+        allow_compact / depth: see XML.write().
+        """
+        if not hasattr(file, "write"):
+            self.file = open(file, "w", encoding = "utf-8-sig")
+            self.file.write(_xml_declaration)
+        else:
+            self.file = file
+        self._owns_file = self.file is not file
+        self.allow_compact = allow_compact
+        self.depth = depth
+        self._stack = [] #For all opened tags: [tag, depth, state], with state 0 if nothing has been written to the tag yet, 1 if its only entry is a (postponed) string, or 2 if its header has been written
+        self._chunk = [] #The pieces of text that have not been written to the file yet
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else: #Do not complete the opened tags, but do write what has been written so far
+            self.__flush()
+            if self._owns_file:
+                self.file.close()
+            self._closed = True
+
+    def start(self, name, attributes = None, format = "auto"):
+        """
+        Opens a new tag, nested in the currently opened tag (if any)
+
+        The arguments are the same as for creating an XML tag. The tag is completed by calling end().
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed writer")
+        tag = XML(name, attributes = attributes, format = format)
+        self._stack.append([tag, self.__prepare(), 0])
+
+    def end(self):
+        """
+        Completes the most recently opened tag
+        """
+        if not self._stack:
+            raise ValueError("There is no opened tag to end")
+        tag, depth, state = self._stack.pop()
+        if state < 2: #The entire tag is still known, so it can be written exactly as XML.write() would
+            self.__extend(tag.serialize(self.allow_compact, depth))
+        elif tag.format != "short":
+            self.__append(f"{depth * '  '}</{tag._name}>\n")
+
+    def element(self, name, attributes = None, format = "auto"):
+        """
+        Returns a context manager that opens a tag on entering, and completes it on exiting (see start())
+        """
+        return _WriterElement(self, name, attributes, format)
+
+    def write(self, value):
+        """
+        Writes a (completed) XML tag or text to the currently opened tag
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed writer")
+        if self._stack and self._stack[-1][2] == 0 and not isinstance(value, XML): #A single string may have to be written in the compact form; postpone it until it is known whether more entries follow
+            frame = self._stack[-1]
+            frame[0]._database = (value,)
+            frame[2] = 1
+            return
+        depth = self.__prepare()
+        if isinstance(value, XML):
+            self.__extend(value.serialize(self.allow_compact, depth))
+        else:
+            self.__text(value, depth)
+
+    def close(self):
+        """
+        Completes all opened tags, and writes the remaining output to the file (closing it, if it was opened by the writer)
+        """
+        if self._closed:
+            return
+        while self._stack:
+            self.end()
+        self.__flush()
+        if self._owns_file:
+            self.file.close()
+        self._closed = True
+
+    def __prepare(self):
+        """
+        Writes the header of the currently opened tag (if this has not happened yet), as it gets another entry
+
+        returns: int - The depth at which the entry has to be written.
+        """
+        if not self._stack:
+            return self.depth
+        frame = self._stack[-1]
+        tag, depth, state = frame
+        if state < 2:
+            self.__append(f"{depth * '  '}{tag._header(tag.format == 'short')}\n")
+            frame[2] = 2
+            if state == 1:
+                self.__text(tag._database[0], depth + 1)
+                tag._database = ()
+        return depth + 1
+
+    def __text(self, text, depth):
+        indent = depth * "  "
+        self.__append(f"{indent}{XML.encode(text.replace(chr(10), chr(10) + indent), True)}\n")
+
+    def __append(self, string):
+        self._chunk.append(string)
+        if len(self._chunk) >= 4096: #Collect the output in larger chunks, to minimise the number of write calls
+            self.__flush()
+
+    def __extend(self, strings):
+        for string in strings:
+            self.__append(string)
+
+    def __flush(self):
+        self.file.write("".join(self._chunk))
+        self._chunk.clear()
+
+class _WriterElement():
+    """
+    Context manager returned by XMLWriter.element()
+    """
+    __slots__ = ("writer", "name", "attributes", "format")
+
+    def __init__(self, writer, name, attributes, format):
+        self.writer = writer
+        self.name = name
+        self.attributes = attributes
+        self.format = format
+
+    def __enter__(self):
+        self.writer.start(self.name, self.attributes, self.format)
+        return self.writer
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None: #Like XMLWriter, the tag is left incomplete if an error occurred
+            self.writer.end()
+
+class XMLStats():
+    """
+    Statistics of parsing / writing XML structures, collected by passing an instance as the stats argument of XML.from_str(), XML.XMLFile(), XML.write(), XML.tostring() or XML.to_bytes()
+
+    The statistics accumulate over all calls the instance is passed to; as_dict() returns them as a flat dict (e.g. to export them to a metrics system), and reset() starts over.
+    Nothing is collected (nor does it cost any time) unless an instance is passed. The counts are taken from the resulting structure afterwards; only measuring the time per phase of parsing slows the parsing itself down, which can be disabled using timings = False.
+    Sizes are counted in characters (characters_parsed / characters_written), as well as in bytes for the files that are parsed / written, and the data returned by to_bytes() (bytes_parsed / bytes_written). The throughputs are in characters per second. Tags that are not parsed yet (see the lazy argument of XML.from_str()) are counted, but their contents are not.
+    """
+    __slots__ = ("timings", "documents_parsed", "characters_parsed", "bytes_parsed", "elements", "attributes", "text_nodes", "comments", "comments_skipped", "max_depth", "times", "documents_written", "characters_written", "bytes_written", "elements_written", "_measured")
+
+    def __init__(self, timings = True):
+        """
+        timings: bool - Determines whether the time spent in the separate phases of parsing (tokenizing, decoding and building) should be measured, in addition to the total time.
+        """
+        self.timings = timings
+        self.reset()
+
+    def reset(self):
+        """
+        Sets all statistics back to zero
+        """
+        self.documents_parsed = 0
+        self.characters_parsed = 0
+        self.bytes_parsed = 0 #The size of the parsed files (XML.from_str() only counts characters)
+        self.elements = 0 #The number of tags parsed
+        self.attributes = 0
+        self.text_nodes = 0
+        self.comments = 0 #The number of comments included in the parsed structures
+        self.comments_skipped = 0 #The number of comments discarded during parsing (if comments are not included)
+        self.max_depth = 0 #The maximum depth of nested tags in any of the parsed structures (0 for a single tag)
+        #The total time spent parsing and writing (in seconds), and the part of the parse time spent decoding headers / text (including entity decoding), creating tags, and tokenizing (all remaining time)
+        self.times = {"parse": 0.0, "tokenize": 0.0, "decode": 0.0, "build": 0.0, "write": 0.0}
+        self.documents_written = 0
+        self.characters_written = 0
+        self.bytes_written = 0 #The size of the written files / encoded data (XML.write() to a file object and XML.tostring() only count characters)
+        self.elements_written = 0
+        self._measured = 0.0 #The decode and build times up to the end of the last parse
+
+    @property
+    def parse_throughput(self):
+        """
+        The number of characters parsed per second
+        """
+        return self.characters_parsed / self.times["parse"] if self.times["parse"] else 0.0
+
+    @property
+    def write_throughput(self):
+        """
+        The number of characters written per second
+        """
+        return self.characters_written / self.times["write"] if self.times["write"] else 0.0
+
+    def as_dict(self):
+        """
+        Returns all statistics as a (flat) dict
+        """
+        stats = {name: getattr(self, name) for name in self.__slots__ if name not in ("timings", "times", "_measured")}
+        stats.update((f"{phase}_time", duration) for phase, duration in self.times.items())
+        stats["parse_throughput"] = self.parse_throughput
+        stats["write_throughput"] = self.write_throughput
+        return stats
+
+    def __repr__(self):
+        return f"XMLStats({', '.join(f'{name}={value}' for name, value in self.as_dict().items())})"
+
+    def _timed(self, function, phase):
+        """
+        Returns a variant of function that adds the time spent calling it to the time of the given phase
+        """
+        times = self.times
+        counter = time.perf_counter
+        def timed(*args):
+            start = counter()
+            result = function(*args)
+            times[phase] += counter() - start
+            return result
+        return timed
+
+    def _add_parse(self, tag, characters, duration, timed):
+        """
+        Adds the statistics of a parsed structure
+
+        timed: bool - Whether the decode / build times of the parse were measured (if enabled); the remaining time is then counted as tokenizing.
+        """
+        self.documents_parsed += 1
+        self.characters_parsed += characters
+        self.times["parse"] += duration
+        measured = self.times["decode"] + self.times["build"]
+        if timed and self.timings:
+            self.times["tokenize"] += duration - (measured - self._measured)
+        self._measured = measured
+        stack = [(tag, 0)]
+        while stack:
+            tag, depth = stack.pop()
+            self.elements += 1
+            if isinstance(tag, _Unparsed):
+                continue
+            self.attributes += len(tag._attributes)
+            self.max_depth = max(self.max_depth, depth)
+            for entry in tag._database:
+                if isinstance(entry, XML):
+                    stack.append((entry, depth + 1))
+                elif entry.startswith("<!--") and entry.endswith("-->"):
+                    self.comments += 1
+                else:
+                    self.text_nodes += 1
+
+    def _add_write(self, tag, characters, duration):
+        """
+        Adds the statistics of a written structure
+        """
+        self.documents_written += 1
+        self.characters_written += characters
+        self.times["write"] += duration
+        self.elements_written += 1 + sum(1 for _ in tag.iter_tags())
+
+class XMLCache():
+    """
+    Least recently used cache of parsed XML files, used by XML.XMLFile(cache = True)
+
+    Files are identified by their resolved path; a cached structure is only used as long as the file has the same size and modification time as when it was parsed.
+    The least recently used structures are evicted once the total size of the cached files exceeds max_size. The cache can safely be shared between threads.
+    """
+    def __init__(self, max_size = 256 * 2 ** 20):
+        """
+        max_size: int - The maximum total size (in bytes) of the files of which the structures are cached. Files larger than this are never cached.
+        """
+        self.max_size = max_size
+        self.size = 0 #The total size of the cached files
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {} #{(path, include_comments, tag_class): (size, modification time, tag, trailing data)}, from least to most recently used
+        self._lock = threading.Lock()
+
+    def info(self):
+        """
+        Returns the statistics of the cache as dict
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries), "size": self.size, "max_size": self.max_size}
+
+    def clear(self):
+        """
+        Removes all cached structures (the statistics are kept)
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _load(self, tag_class, filepath, include_comments, return_trailing, workers, stats):
+        """
+        Loads a file like XML.XMLFile(), returning a copy of the cached structure if possible
+        """
+        path = os.path.realpath(filepath)
+        key = (path, include_comments, tag_class)
+        with open(path, "r", encoding = "utf-8-sig") as file:
+            status = os.fstat(file.fileno()) #The status of the file that is actually read, in case it is replaced in the meantime
+            with self._lock:
+                if (entry := self._entries.get(key)) is not None and entry[:2] == (status.st_size, status.st_mtime_ns):
+                    self._entries[key] = self._entries.pop(key) #Move to the end, as most recently used
+                    self.hits += 1
+                else:
+                    entry = None
+                    self.misses += 1
+            if entry is None:
+                tag, trailing = tag_class.from_str(file.read(), include_comments, True, False, workers, stats)
+                if stats is not None:
+                    stats.bytes_parsed += status.st_size
+                entry = (status.st_size, status.st_mtime_ns, tag, trailing)
+                self.__store(key, entry)
+        tag = entry[2]._clone()
+        return (tag, entry[3]) if return_trailing else tag
+
+    def __store(self, key, entry):
+        """
+        Adds a parsed structure to the cache, replacing the outdated structure of the same file (if any), and evicts the least recently used structures if needed
+        """
+        with self._lock:
+            if (outdated := self._entries.pop(key, None)) is not None:
+                self.size -= outdated[0]
+            if entry[0] > self.max_size:
+                return
+            self._entries[key] = entry
+            self.size += entry[0]
+            while self.size > self.max_size:
+                evicted = self._entries.pop(next(iter(self._entries)))
+                self.size -= evicted[0]
+                self.evictions += 1
+
+file_cache = XMLCache() #The cache used by XML.XMLFile(cache = True)
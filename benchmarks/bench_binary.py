@@ -0,0 +1,44 @@
+"""
+Benchmark: Load time of binary snapshots (XML.from_binary) compared to parsing (XML.XMLFile)
+
+Prints the size of the XML file and the snapshot, and the best time of storing / loading them, along with the speedup of loading the snapshot relative to parsing the XML file.
+Usage: python benchmarks/bench_binary.py [records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+from bench_parse import make_document
+
+def best(function, repeat = 5):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+def main(records = 50000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "document.xml")
+        snapshot = os.path.join(directory, "document.xmlb")
+        root = XML.from_str(make_document(records))
+        root.write(path)
+        root.to_binary(snapshot)
+        if XML.from_binary(snapshot).tostring() != root.tostring():
+            raise AssertionError("The loaded snapshot differs from the original structure")
+        with open(snapshot, "rb") as file:
+            data = file.read()
+        print(f"{records} records, XML {os.path.getsize(path) / 1e6:.2f} MB, snapshot {os.path.getsize(snapshot) / 1e6:.2f} MB")
+        parse = best(lambda: XML.XMLFile(path))
+        print(f"{'operation':>24} {'seconds':>9} {'speedup':>8}")
+        for label, function in (("write", lambda: root.write(path)), ("to_binary", lambda: root.to_binary(snapshot)), ("XMLFile", None), ("from_binary (mmap)", lambda: XML.from_binary(snapshot)), ("from_binary (bytes)", lambda: XML.from_binary(data))):
+            duration = best(function) if function else parse
+            speedup = f"{parse / duration:>8.2f}" if label.startswith("from_binary") else f"{'-':>8}"
+            print(f"{label:>24} {duration:>9.3f} {speedup}")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
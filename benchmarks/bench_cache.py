@@ -0,0 +1,39 @@
+"""
+Benchmark: Time of XML.XMLFile with and without the parse cache
+
+Prints the time of loading a generated file without cache, the first (uncached) load with cache = True, and the best time of the subsequent (cached) loads, which only copy the cached structure.
+Usage: python benchmarks/bench_cache.py [records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLCache
+from bench_parse import make_document
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main(records = 20000, repeat = 5):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "document.xml")
+        with open(path, "w", encoding = "utf-8") as file:
+            file.write(make_document(records))
+        cache = XMLCache()
+        uncached, expected = timed(lambda: XML.XMLFile(path))
+        first, _ = timed(lambda: XML.XMLFile(path, cache = cache))
+        cached = min(timed(lambda: XML.XMLFile(path, cache = cache))[0] for _ in range(repeat))
+        if XML.XMLFile(path, cache = cache).tostring() != expected.tostring():
+            raise AssertionError("The cached structure differs from the parsed structure")
+        print(f"{records} records, {os.path.getsize(path) / 1e6:.2f} MB")
+        print(f"{'load':>16} {'seconds':>9} {'speedup':>8}")
+        for label, duration in (("no cache", uncached), ("cache (miss)", first), ("cache (hit)", cached)):
+            print(f"{label:>16} {duration:>9.3f} {uncached / duration:>8.2f}")
+        print(cache.info())
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+Benchmark: Time and memory of copying a template structure and modifying a few tags, with copy(True) and copy(True, copy_on_write = True)
+
+For growing template sizes, prints the time and the memory allocated (using tracemalloc) for copying the template and changing an attribute of a few records; with copy-on-write, only the accessed tags are copied, so these grow with the number of records (the width of the records tag), but not with the size of the records themselves.
+A second table does the same while the previous copy is still alive: each round renames a tag of an unrelated structure, makes a new copy, and edits the previous copy as well. With copy-on-write, this should cost about twice as much as a single edit, regardless of the number of copies that are alive.
+A third table collects growing numbers of edited copies of a small template in a tag that is older than the copies. The time and memory per copy should stay the same, as the tags the copies are added to are not part of the template.
+Usage: python benchmarks/bench_copy.py [max_records]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def make_template(records):
+    return "<template><header><title>Template</title></header><records>" + "".join(f'<record id="{i}"><name>Record {i}</name><value type="int">{i}</value></record>' for i in range(records)) + "</records></template>"
+
+def edit(template, copy_on_write):
+    copy = template.copy(True, copy_on_write)
+    copy["header"]["title"][0] = "Copy"
+    records = copy["records"]
+    for index in (0, len(records.tags) // 2, -1):
+        records[index]["id"] = "changed"
+    return copy
+
+def edit_alive(template, copy_on_write, rounds = 4):
+    other = XML.from_str('<request><body id="1"/></request>') #Older than the copies, but not part of the template
+    previous = edit(template, copy_on_write)
+    for index in range(rounds):
+        other.tags[0].name = f"body{index}"
+        copy = edit(template, copy_on_write)
+        previous["records"][index + 1]["id"] = "changed again"
+        previous = copy
+    return previous
+
+def collect(count, copy_on_write):
+    template = XML.from_str('<record id="0"><name>Record</name><value type="int">0</value></record>')
+    records = XML("records")
+    for index in range(count):
+        copy = template.copy(True, copy_on_write)
+        copy["id"] = str(index)
+        records.append(copy)
+    return records
+
+def main(max_records = 100000):
+    print(f"{'records':>8} {'copy s':>9} {'copy MB':>8} {'cow s':>9} {'cow MB':>8} {'speedup':>8}")
+    records = max_records // 16
+    while records <= max_records:
+        template = XML.from_str(make_template(records))
+        if edit(template, True).tostring() != edit(template, False).tostring():
+            raise AssertionError("The copy-on-write copy differs from the regular copy")
+        results = []
+        for copy_on_write in (False, True):
+            start = time.perf_counter()
+            edit(template, copy_on_write)
+            duration = time.perf_counter() - start
+            tracemalloc.start()
+            copy = edit(template, copy_on_write)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del copy
+            results += [duration, memory / 1e6]
+        print(f"{records:>8} {results[0]:>9.4f} {results[1]:>8.2f} {results[2]:>9.4f} {results[3]:>8.2f} {results[0] / results[2]:>8.1f}")
+        records *= 2
+    print("\nWith the previous copy alive (per round):")
+    print(f"{'records':>8} {'copy s':>9} {'cow s':>9} {'speedup':>8}")
+    records = max_records // 16
+    while records <= max_records:
+        template = XML.from_str(make_template(records))
+        if edit_alive(template, True).tostring() != edit_alive(template, False).tostring():
+            raise AssertionError("The copy-on-write copy differs from the regular copy")
+        results = []
+        for copy_on_write in (False, True):
+            start = time.perf_counter()
+            edit_alive(template, copy_on_write)
+            results.append((time.perf_counter() - start) / 5)
+        print(f"{records:>8} {results[0]:>9.4f} {results[1]:>9.4f} {results[0] / results[1]:>8.1f}")
+        records *= 2
+    print("\nCopies collected in an older tag (per copy):")
+    print(f"{'copies':>8} {'copy us':>9} {'copy B':>8} {'cow us':>9} {'cow B':>8}")
+    count = max_records // 16
+    while count <= max_records:
+        results = []
+        for copy_on_write in (False, True):
+            tracemalloc.start()
+            start = time.perf_counter()
+            copies = collect(count, copy_on_write)
+            duration = time.perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del copies
+            results += [duration / count * 1e6, memory / count]
+        print(f"{count:>8} {results[0]:>9.2f} {results[1]:>8.0f} {results[2]:>9.2f} {results[3]:>8.0f}")
+        count *= 2
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
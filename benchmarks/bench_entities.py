@@ -0,0 +1,38 @@
+"""
+Micro-benchmark: XML.encode / XML.decode on typical attribute values and text
+
+Reports the time per call in microseconds. Pass the path of another version of XML.py to compare both implementations.
+Usage: python benchmarks/bench_entities.py [path/to/other/XML.py]
+"""
+import os
+import sys
+import timeit
+
+from bench_memory import ROOT, load
+
+SAMPLES = {
+    "id attribute": "part-000123",
+    "name attribute": "Hydraulic pump assembly, left",
+    "sentence": "The quick brown fox jumps over the lazy dog, and keeps on running for a while." * 2,
+    "paragraph": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40,
+    "entity sentence": "Fish & chips <large> for \"John\" and 'Jane'" * 2,
+    "entity paragraph": "Terms & conditions apply; see <section> \"4\". " * 40,
+}
+
+def main(other = None):
+    implementations = {"current": load(os.path.join(ROOT, "XML.py"), "current")}
+    if other:
+        implementations["other"] = load(other, "other")
+    print(f"{'sample':>18} {'chars':>6} " + " ".join(f"{name + ' ' + function:>18}" for name in implementations for function in ("encode", "decode")))
+    for sample, text in SAMPLES.items():
+        encoded = implementations["current"].encode(text)
+        times = []
+        for XML in implementations.values():
+            for function, argument in ((XML.encode, text), (XML.decode, encoded)):
+                timer = timeit.Timer(lambda: function(argument))
+                number, _ = timer.autorange()
+                times.append(min(timer.repeat(5, number)) / number * 1e6)
+        print(f"{sample:>18} {len(text):>6} " + " ".join(f"{time:>18.3f}" for time in times))
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
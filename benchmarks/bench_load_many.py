@@ -0,0 +1,41 @@
+"""
+Benchmark: Time of loading a directory of generated XML files with XML.load_many, compared to calling XML.XMLFile for each file
+
+Prints the time and speedup of loading all files one at a time, and with load_many using threads and processes, for a growing number of workers (up to the number of CPU cores).
+Usage: python benchmarks/bench_load_many.py [files] [records_per_file]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+from bench_parse import make_document
+
+def main(files = 500, records = 200):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(files):
+            paths.append(os.path.join(directory, f"file{index}.xml"))
+            with open(paths[-1], "w", encoding = "utf-8") as file:
+                file.write(make_document(records))
+        print(f"{files} files of {sum(map(os.path.getsize, paths)) / files / 1e3:.1f} kB, {os.cpu_count()} cores")
+        start = time.perf_counter()
+        expected = [XML.XMLFile(path).tostring() for path in paths]
+        serial = time.perf_counter() - start
+        print(f"{'executor':>8} {'workers':>8} {'seconds':>9} {'speedup':>8}")
+        print(f"{'-':>8} {'-':>8} {serial:>9.3f} {1:>8.2f}")
+        for executor in ("thread", "process"):
+            workers = 1
+            while workers <= max(os.cpu_count(), 2):
+                start = time.perf_counter()
+                results = list(XML.load_many(paths, workers, executor))
+                duration = time.perf_counter() - start
+                if any(error is not None or tag.tostring() != expected[index] for index, (_, tag, error) in enumerate(results)):
+                    raise AssertionError(f"load_many with {workers} {executor} workers differs from XMLFile")
+                print(f"{executor:>8} {workers:>8} {duration:>9.3f} {serial / duration:>8.2f}")
+                workers *= 2
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,53 @@
+"""
+Benchmark: Memory used per tag by a parsed XML structure
+
+Reports the number of bytes allocated per tag (including its strings and containers) for documents of various shapes.
+Pass the path of another version of XML.py to compare both implementations, e.g. one checked out from an older commit.
+Usage: python benchmarks/bench_memory.py [path/to/other/XML.py]
+"""
+import gc
+import importlib.util
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load(path, name):
+    """
+    Imports the XML class from the module at the given path
+    """
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.XML
+
+DOCUMENTS = {
+    "leaves": lambda n: "<root>" + "".join(f"<leaf/>" for i in range(n)) + "</root>",
+    "records": lambda n: "<root>" + "".join(f'<record id="{i}" type="part"><name>Part {i}</name><size x="1" y="2"/></record>' for i in range(n // 3)) + "</root>",
+    "nested": lambda n: "<root>" + "".join(f"<a><b><c>{i}</c></b></a>" for i in range(n // 3)) + "</root>",
+}
+
+def measure(XML, data):
+    """
+    Returns the number of bytes allocated per tag by parsing the given data
+    """
+    gc.collect()
+    tracemalloc.start()
+    root = XML.from_str(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tags = 1 + sum(1 for tag in root.iter_tags())
+    return size / tags
+
+def main(other = None):
+    implementations = {"current": load(os.path.join(ROOT, "XML.py"), "current")}
+    if other:
+        implementations["other"] = load(other, "other")
+    print(f"{'document':>10} " + " ".join(f"{name + ' B/tag':>14}" for name in implementations))
+    for shape, make in DOCUMENTS.items():
+        data = make(30000)
+        print(f"{shape:>10} " + " ".join(f"{measure(XML, data):>14.1f}" for XML in implementations.values()))
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
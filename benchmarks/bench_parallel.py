@@ -0,0 +1,34 @@
+"""
+Benchmark: Parse time of XML.from_str(data, workers = N) for a growing number of worker processes
+
+Prints the time and the speedup relative to the serial parse (workers = None) for each worker count, up to the number of CPU cores.
+Usage: python benchmarks/bench_parallel.py [records]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+from bench_parse import make_document
+
+def main(records = 200000):
+    data = make_document(records)
+    print(f"{records} records, {len(data) / 1e6:.2f} MB, {os.cpu_count()} cores")
+    start = time.perf_counter()
+    expected = XML.from_str(data).tostring()
+    serial = time.perf_counter() - start
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+    print(f"{'-':>8} {serial:>9.3f} {1:>8.2f}")
+    workers = 2
+    while workers <= max(os.cpu_count(), 2):
+        start = time.perf_counter()
+        result = XML.from_str(data, workers = workers)
+        duration = time.perf_counter() - start
+        if result.tostring() != expected:
+            raise AssertionError(f"Parallel parse with {workers} workers differs from the serial parse")
+        print(f"{workers:>8} {duration:>9.3f} {serial / duration:>8.2f}")
+        workers *= 2
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
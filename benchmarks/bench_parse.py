@@ -0,0 +1,74 @@
+"""
+Benchmark: Parse time of XML.from_str for growing document sizes
+
+Prints the time per MB for each size; for a linear time parser this number should remain (roughly) constant.
+Besides regular records, documents with many differently named children / deeply nested, differently named tags are parsed, as these defeat caching by tag name.
+The lazy cases load the documents with lazy = True and access the children of the root, which locates each of them (skipping their contents).
+Usage: python benchmarks/bench_parse.py [max_records]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def make_document(records):
+    """
+    Builds a document containing the given number of (small) records
+    """
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', "<records>"]
+    for i in range(records):
+        lines.append(f'  <record id="{i}" type="part">')
+        lines.append(f"    <name>Part &amp; number {i}</name>")
+        lines.append("    <!-- A comment -->")
+        lines.append(f'    <size x="{i % 7}" y="{i % 11}"/>')
+        lines.append("  </record>")
+    lines.append("</records>")
+    return "\n".join(lines)
+
+def make_wide_document(children):
+    """
+    Builds a document in which the root contains the given number of children, all with a different name
+    """
+    return "<root>\n" + "".join(f"  <item{i}>{i}</item{i}>\n" for i in range(children)) + "</root>"
+
+def make_deep_document(depth, distinct = True):
+    """
+    Builds a document of tags nested to the given depth, either all with a different name or all with the same name
+    """
+    names = [f"level{i}" if distinct else "level" for i in range(depth)]
+    return "".join(f"<{name}>" for name in names) + "text" + "".join(f"</{name}>" for name in reversed(names))
+
+def measure(label, count, data, lazy = False):
+    start = time.perf_counter()
+    if lazy:
+        XML.from_str(data, lazy = True).tags
+    else:
+        XML.from_str(data)
+    duration = time.perf_counter() - start
+    size = len(data) / 1e6
+    print(f"{label:>16} {count:>10} {size:>8.2f} {duration:>9.3f} {duration / size:>7.3f}")
+
+def main(max_records = 200000):
+    print(f"{'document':>16} {'count':>10} {'MB':>8} {'seconds':>9} {'s/MB':>7}")
+    records = max_records // 16
+    while records <= max_records:
+        measure("records", records, make_document(records))
+        measure("lazy records", records, make_document(records), True)
+        records *= 2
+    children = max_records // 16
+    while children <= max_records // 2:
+        measure("distinct wide", children, make_wide_document(children))
+        measure("lazy wide", children, make_wide_document(children), True)
+        children *= 2
+    depth = max_records // 40
+    while depth <= max_records // 5:
+        measure("distinct deep", depth, make_deep_document(depth))
+        measure("lazy deep", depth, make_deep_document(depth), True)
+        measure("same-name deep", depth, make_deep_document(depth, False))
+        measure("lazy same-name", depth, make_deep_document(depth, False), True)
+        depth *= 2
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,35 @@
+"""
+Benchmark: Time of XML.reduce and XML.expand for growing wide and deep trees
+
+Prints the time per tag for each size; for linear time implementations this number should remain (roughly) constant.
+Usage: python benchmarks/bench_reduce.py [max_tags]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+SHAPES = {
+    "wide": lambda n: "<root>" + "".join(f"<field{i}>value {i}</field{i}>" for i in range(n)) + "</root>", #A single tag with n reducible children
+    "deep": lambda n: "".join(f"<level><value>{i}</value>" for i in range(n)) + "</level>" * n, #n nested tags, each with a reducible child
+}
+
+def main(max_tags = 128000):
+    print(f"{'shape':>6} {'tags':>8} {'reduce s':>9} {'us/tag':>7} {'expand s':>9} {'us/tag':>7}")
+    for shape, make in SHAPES.items():
+        tags = max_tags // 32
+        while tags <= max_tags:
+            root = XML.from_str(make(tags))
+            start = time.perf_counter()
+            root.reduce()
+            reduced = time.perf_counter() - start
+            start = time.perf_counter()
+            root.expand()
+            expanded = time.perf_counter() - start
+            print(f"{shape:>6} {tags:>8} {reduced:>9.3f} {reduced / tags * 1e6:>7.2f} {expanded:>9.3f} {expanded / tags * 1e6:>7.2f}")
+            tags *= 2
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
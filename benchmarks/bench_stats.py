@@ -0,0 +1,42 @@
+"""
+Benchmark: Overhead of collecting statistics (XMLStats) while parsing and writing
+
+Prints the best time of parsing / writing a generated document without statistics, with counts and total times only (timings = False), and with the time per phase of parsing (timings = True), followed by the collected statistics.
+Usage: python benchmarks/bench_stats.py [records]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLStats
+from bench_parse import make_document
+
+def best(function, repeat = 5):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+def main(records = 20000):
+    data = make_document(records)
+    root = XML.from_str(data)
+    print(f"{records} records, {len(data) / 1e6:.2f} MB")
+    print(f"{'stats':>16} {'parse s':>8} {'ratio':>6} {'write s':>8} {'ratio':>6}")
+    variants = {"-": lambda: None, "timings=False": lambda: XMLStats(False), "timings=True": lambda: XMLStats()}
+    baseline = None
+    for label, make in variants.items():
+        parse = best(lambda: XML.from_str(data, stats = make()))
+        write = best(lambda: root.tostring(stats = make()))
+        baseline = baseline or (parse, write)
+        print(f"{label:>16} {parse:>8.3f} {parse / baseline[0]:>6.2f} {write:>8.3f} {write / baseline[1]:>6.2f}")
+    stats = XMLStats()
+    XML.from_str(data, stats = stats)
+    root.tostring(stats = stats)
+    for name, value in stats.as_dict().items():
+        print(f"{name:>20}: {value:.6g}" if isinstance(value, float) else f"{name:>20}: {value}")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
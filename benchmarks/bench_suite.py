@@ -0,0 +1,152 @@
+"""
+Benchmark suite: Parsing, lookups, queries, transformations and writing, for several document shapes and sizes
+
+Synthetic documents are generated deterministically for each shape (wide, deep, attributes, text, comments) and size. For each operation, the best time out of a number of runs is reported, along with the throughput (tags and MB of source document per second) and the peak memory allocated during the operation (measured in a separate run, using tracemalloc).
+Results can be saved as baseline, and compared against a saved baseline; operations that became slower or use more memory than the threshold allows are flagged, and the exit code is 1 if there are any.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1000 10000] [--shapes wide deep ...] [--operations from_str write ...] [--repeat 5]
+                                        [--save baseline.json] [--compare baseline.json] [--threshold 1.2] [--implementation path/to/other/XML.py]
+For example, to check the current version against the previous commit:
+    git show HEAD~1:XML.py > /tmp/XML_previous.py
+    python benchmarks/bench_suite.py --implementation /tmp/XML_previous.py --save /tmp/baseline.json
+    python benchmarks/bench_suite.py --compare /tmp/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench_memory import ROOT, load
+
+SHAPES = {
+    #Each shape returns a document with (about) n tags, and whether comments should be included when parsing it.
+    "wide": lambda n: ("<root>" + "".join(f'<item id="{i}">value {i}</item>' for i in range(n - 1)) + "</root>", False),
+    "deep": lambda n: ("<root>" + "".join("".join(f'<node level="{level}">' for level in range(100)) + f"leaf {i}" + "</node>" * 100 for i in range(n // 100)) + "</root>", False), #Chains of 100 nested tags
+    "attributes": lambda n: ("<root>" + "".join(f"<item " + " ".join(f'attribute{j}="value {i}.{j}"' for j in range(10)) + "/>" for i in range(n - 1)) + "</root>", False),
+    "text": lambda n: ("<root>" + "".join(f"<p id=\"{i}\">\n  Fish &amp; chips &lt;large&gt; for &quot;John&quot; &amp; &apos;Jane&apos; #{i}\n  Terms &amp; conditions apply; see &lt;section&gt; 4.\n</p>" for i in range(n - 1)) + "</root>", False),
+    "comments": lambda n: ("<root>" + "".join(f"<!-- Comment {i}: generated item -->\n<item id=\"{i}\"/>\n<!-- End of item {i} -->" for i in range(n - 1)) + "</root>", True),
+}
+
+def operations(XML, data, include_comments, path):
+    """
+    Returns the operations to be timed, as {name: setup function}
+
+    Each setup function returns the function to be timed (with all preparations that should not be timed done), and the number of tags it processes.
+    """
+    def parsed():
+        return XML.from_str(data, include_comments)
+    def getitem():
+        root = parsed()
+        keys = [(tag, key) for tag in (root, *root.iter_tags()) for key in (*tag.attributes, *[child.name for child in tag.database if isinstance(child, XML)][:1])]
+        return lambda: [tag[key] for tag, key in keys], len(keys)
+    def find_all():
+        root = parsed()
+        name = next(root.iter_tags(-1, False)).name
+        return lambda: root.find_all(name), tags
+    def get_filtered():
+        root = parsed()
+        #Search for the value of the last attribute in the document, so the entire structure has to be searched
+        attribute, value = next(((attribute, value) for tag in reversed(tuple(root.iter_tags())) for attribute, value in tag.attributes.items()), ("id", None))
+        return lambda: root.get_filtered(attribute, value), tags
+    def reduce():
+        return parsed().reduce, tags
+    def expand():
+        root = parsed()
+        root.reduce()
+        return root.expand, tags
+    def copy():
+        root = parsed()
+        return lambda: root.copy(True), tags
+    def write():
+        root = parsed()
+        return lambda: root.write(path + ".out"), tags
+    tags = 1 + sum(1 for _ in parsed().iter_tags())
+    return {
+        "from_str": lambda: (parsed, tags),
+        "XMLFile": lambda: (lambda: XML.XMLFile(path, include_comments), tags),
+        "__getitem__": getitem,
+        "find_all": find_all,
+        "get_filtered": get_filtered,
+        "reduce": reduce,
+        "expand": expand,
+        "copy(True)": copy,
+        "write": write,
+    }
+
+def measure(setup, repeat):
+    """
+    Returns the best time (in seconds) out of a number of runs, the peak memory (in bytes) allocated during a single run, and the number of tags processed
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        function, tags = setup()
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+        del function
+    function, tags = setup()
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, tags
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Benchmark suite for XML.py")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10000], help = "The (approximate) numbers of tags of the generated documents")
+    parser.add_argument("--shapes", nargs = "+", choices = list(SHAPES), default = list(SHAPES))
+    parser.add_argument("--operations", nargs = "+", default = None, help = "The operations to run (default: all)")
+    parser.add_argument("--repeat", type = int, default = 5, help = "The number of timed runs per operation; the best time is reported")
+    parser.add_argument("--save", help = "Save the results as baseline to this (json) file")
+    parser.add_argument("--compare", help = "Compare the results to the baseline saved in this (json) file")
+    parser.add_argument("--threshold", type = float, default = 1.2, help = "The ratio to the baseline (time or memory) above which an operation is flagged")
+    parser.add_argument("--implementation", default = os.path.join(ROOT, "XML.py"), help = "The XML.py to benchmark")
+    arguments = parser.parse_args(arguments)
+
+    XML = load(arguments.implementation, "benchmarked")
+    baseline = {}
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)["results"]
+    results = {}
+    regressions = []
+    print(f"{'shape':>10} {'tags':>7} {'MB':>6} {'operation':>12} {'seconds':>9} {'ktags/s':>9} {'MB/s':>7} {'peak MB':>8}" + (f" {'time':>6} {'memory':>6}" if baseline else ""))
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in arguments.shapes:
+            for size in arguments.sizes:
+                data, include_comments = SHAPES[shape](size)
+                path = os.path.join(directory, f"{shape}_{size}.xml")
+                with open(path, "w", encoding = "utf-8") as file:
+                    file.write(data)
+                megabytes = len(data.encode("utf-8")) / 1e6
+                for operation, setup in operations(XML, data, include_comments, path).items():
+                    if arguments.operations and operation not in arguments.operations:
+                        continue
+                    seconds, peak, tags = measure(setup, arguments.repeat)
+                    key = f"{shape}/{size}/{operation}"
+                    results[key] = {"seconds": seconds, "peak": peak}
+                    line = f"{shape:>10} {size:>7} {megabytes:>6.2f} {operation:>12} {seconds:>9.4f} {tags / seconds / 1e3:>9.1f} {megabytes / seconds:>7.2f} {peak / 1e6:>8.2f}"
+                    if key in baseline:
+                        time_ratio = seconds / baseline[key]["seconds"]
+                        memory_ratio = peak / baseline[key]["peak"] if baseline[key]["peak"] else 1
+                        line += f" {time_ratio:>6.2f} {memory_ratio:>6.2f}"
+                        if time_ratio > arguments.threshold or memory_ratio > arguments.threshold:
+                            line += "  REGRESSION"
+                            regressions.append(key)
+                    print(line, flush = True)
+
+    if arguments.save:
+        with open(arguments.save, "w") as file:
+            json.dump({"implementation": arguments.implementation, "python": sys.version, "results": results}, file, indent = 1)
+    if baseline:
+        print(f"{len(regressions)} regression(s) beyond a ratio of {arguments.threshold}" + (": " + ", ".join(regressions) if regressions else ""))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
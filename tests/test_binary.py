@@ -0,0 +1,57 @@
+"""
+Tests: Binary snapshots (XML.to_binary / XML.from_binary) restore the structure exactly, and reject invalid data
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+document = '<?xml version="1.0" encoding="utf-8"?>\n<root a="1" b="&amp;"><!-- comment --><c/><d format="x">text &lt; more</d><e></e></root>'
+
+def test_round_trip():
+    root = XML.from_str(document, include_comments = True)
+    loaded = XML.from_binary(root.to_binary())
+    assert loaded.tostring(declaration = True) == root.tostring(declaration = True)
+    values = XML.from_binary(XML("values", [1, 2.5, True, None, 10 ** 30]).to_binary())
+    assert values.database == [1, 2.5, True, None, 10 ** 30]
+
+def test_item_sizes_follow_largest_value():
+    small = XML("root", [XML("a", ["text"])]).to_binary()
+    large = XML("root", [XML("a", ["x" * 70000])]).to_binary()
+    assert XML.from_binary(small).tostring() == XML("root", [XML("a", ["text"])]).tostring()
+    assert XML.from_binary(large).tags[0].database == ["x" * 70000]
+    assert len(small) < len(XML("root", [XML("a", ["text"])]).tostring()) + 64
+
+def test_truncated_snapshots_are_rejected():
+    data = XML.from_str(document, include_comments = True).to_binary()
+    for size in range(len(data)):
+        with pytest.raises(ValueError):
+            XML.from_binary(data[:size])
+
+def test_corrupt_snapshots_are_rejected():
+    data = XML.from_str(document, include_comments = True).to_binary()
+    for index in range(len(data)):
+        corrupt = bytearray(data)
+        corrupt[index] ^= 0x55
+        with pytest.raises(ValueError):
+            XML.from_binary(bytes(corrupt))
+
+def test_trailing_data_is_rejected():
+    data = XML.from_str(document).to_binary()
+    with pytest.raises(ValueError):
+        XML.from_binary(data + b"\0")
+
+def test_names_must_be_strings():
+    root = XML.from_str(document)
+    root["c"][3] = "x" #Index past the end of the database, so stored as attribute
+    with pytest.raises(TypeError):
+        root.to_binary()
+    with pytest.raises(TypeError):
+        XML("root", [XML(5)]).to_binary()
+    with pytest.raises(TypeError):
+        XML("root", [[1]]).to_binary()
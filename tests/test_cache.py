@@ -0,0 +1,94 @@
+"""
+Tests: The parse cache (XMLCache / XML.XMLFile(cache = ...)) reuses structures only while files are unchanged, and evicts the least recently used ones
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLCache
+
+def write(path, data, modified = None):
+    path.write_text(data, encoding = "utf-8")
+    if modified is not None:
+        os.utime(path, ns = (modified, modified))
+    return str(path)
+
+def test_hits_and_misses(tmp_path):
+    cache = XMLCache()
+    path = write(tmp_path / "a.xml", '<root id="1"><a/></root>')
+    first = XML.XMLFile(path, cache = cache)
+    second = XML.XMLFile(path, cache = cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first is not second and first.tostring() == second.tostring() == '<root id="1">\n  <a/>\n</root>\n'
+    XML.XMLFile(path, include_comments = True, cache = cache) #Cached separately
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.info() == {"hits": 1, "misses": 2, "evictions": 0, "entries": 2, "size": 2 * os.path.getsize(path), "max_size": cache.max_size}
+
+def test_reload_after_change(tmp_path):
+    cache = XMLCache()
+    path = write(tmp_path / "a.xml", "<root><a/></root>", 10 ** 18)
+    XML.XMLFile(path, cache = cache)
+    write(tmp_path / "a.xml", "<root><b/></root>", 2 * 10 ** 18) #Same size, other modification time
+    assert XML.XMLFile(path, cache = cache).tags[0].name == "b"
+    write(tmp_path / "a.xml", "<root><cc/></root>", 2 * 10 ** 18) #Same modification time, other size
+    assert XML.XMLFile(path, cache = cache).tags[0].name == "cc"
+    assert XML.XMLFile(path, cache = cache).tags[0].name == "cc"
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert cache.info()["entries"] == 1 and cache.size == os.path.getsize(path)
+
+def test_eviction_by_total_size(tmp_path):
+    paths = [write(tmp_path / f"{index}.xml", f"<root>{index:04}</root>") for index in range(4)] #17 bytes each
+    cache = XMLCache(max_size = 3 * 17)
+    for path in paths[:3]:
+        XML.XMLFile(path, cache = cache)
+    XML.XMLFile(paths[0], cache = cache) #Now the most recently used
+    XML.XMLFile(paths[3], cache = cache) #Evicts paths[1]
+    assert (cache.evictions, cache.size) == (1, 3 * 17)
+    cache.hits = cache.misses = 0
+    for path in (paths[0], paths[2], paths[3], paths[1]):
+        XML.XMLFile(path, cache = cache)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_files_larger_than_max_size(tmp_path):
+    small = write(tmp_path / "small.xml", "<a/>")
+    large = write(tmp_path / "large.xml", "<root>" + "<a/>" * 100 + "</root>")
+    cache = XMLCache(max_size = 100)
+    XML.XMLFile(small, cache = cache)
+    for _ in range(2):
+        assert len(XML.XMLFile(large, cache = cache).tags) == 100
+    assert (cache.hits, cache.misses, cache.evictions) == (0, 3, 0)
+    assert cache.info()["entries"] == 1 and cache.size == 4 #Does not evict the smaller file either
+    XML.XMLFile(small, cache = cache)
+    assert cache.hits == 1
+
+def test_returned_structures_are_independent(tmp_path):
+    cache = XMLCache()
+    path = write(tmp_path / "a.xml", '<root id="1"><a k="v">text</a></root>')
+    first = XML.XMLFile(path, cache = cache)
+    first["id"] = "2"
+    first.tags[0].attributes["k"] = "changed"
+    first.tags[0].database.append(XML("b"))
+    first.tags[0].name = "renamed"
+    first.append(XML("c"))
+    second = XML.XMLFile(path, cache = cache)
+    assert cache.hits == 1
+    assert second.tostring() == '<root id="1">\n  <a k="v">text</a>\n</root>\n'
+
+def test_return_trailing(tmp_path):
+    cache = XMLCache()
+    path = write(tmp_path / "a.xml", "<root/>\n<!-- trailing --> data")
+    assert XML.XMLFile(path, cache = cache).name == "root" #Cached with its trailing data, even if it is not requested
+    for _ in range(2):
+        tag, trailing = XML.XMLFile(path, return_trailing = True, cache = cache)
+        assert tag.name == "root" and trailing == "\n<!-- trailing --> data"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_clear(tmp_path):
+    cache = XMLCache()
+    path = write(tmp_path / "a.xml", "<root/>")
+    XML.XMLFile(path, cache = cache)
+    cache.clear()
+    XML.XMLFile(path, cache = cache)
+    assert (cache.hits, cache.misses, cache.size) == (0, 2, 7)
@@ -0,0 +1,176 @@
+"""
+Tests: Copies made using copy(True, copy_on_write = True) stay independent of the original, and the other way around
+
+Usage: python -m pytest tests
+"""
+import gc
+import os
+import sys
+import tracemalloc
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def test_original_changes_do_not_reach_copy():
+    root = XML.from_str('<root><a k="1"><b>text</b></a><c/></root>')
+    expected = root.copy(True).tostring()
+    copy = root.copy(True, copy_on_write = True)
+    a = root.tags[0]
+    a["k"] = "2"
+    a.append(XML("d"))
+    a.tags[0].name = "renamed"
+    a.tags[0].format = "short"
+    root.tags[1].attributes["new"] = "value"
+    assert copy.tostring() == expected
+    assert copy.tags[0]["k"] == "1" and copy.tags[0].tags[0].name == "b"
+
+def test_copy_changes_do_not_reach_original():
+    root = XML.from_str('<root><a k="1"><b>text</b></a></root>')
+    expected = root.tostring()
+    copy = root.copy(True, copy_on_write = True)
+    a = copy.tags[0]
+    a["k"] = "2"
+    a.tags[0].append(XML("d"))
+    a.tags[0].name = "renamed"
+    assert root.tostring() == expected
+
+def test_kept_containers_of_original_do_not_reach_copy():
+    root = XML.from_str('<root><a k="1"><b/></a></root>')
+    attributes = root.tags[0].attributes
+    database = root.tags[0].database
+    copy = root.copy(True, copy_on_write = True)
+    attributes["k"] = "2"
+    database.append(XML("c"))
+    assert copy.tags[0]["k"] == "1" and [tag.name for tag in copy.tags[0].tags] == ["b"]
+
+def test_copy_of_copy():
+    root = XML.from_str('<root><a k="1"><b/></a></root>')
+    copy = root.copy(True, copy_on_write = True)
+    nested = copy.copy(True, copy_on_write = True)
+    root.tags[0].tags[0].name = "changed"
+    copy.tags[0]["k"] = "2"
+    assert nested.tostring() == XML.from_str('<root><a k="1"><b/></a></root>').tostring()
+    assert copy.tags[0].tags[0].name == "b"
+
+def test_reading_does_not_detach_copy():
+    root = XML.from_str('<root><a k="1"><b>text</b></a></root>')
+    copy = root.copy(True, copy_on_write = True)
+    expected = copy.tostring()
+    repr(copy)
+    copy.select_all(".//b")
+    root.tags[0].tags[0].database.append("more")
+    root.tags[0]["k"] = "2"
+    assert copy.tostring() == expected
+    assert copy.select(".//b/text()") == "text"
+
+def test_deep_changes_do_not_reach_copies():
+    root = XML.from_str('<root><a><b><c k="1">text</c></b></a></root>')
+    first = root.copy(True, copy_on_write = True)
+    expected = first.tostring()
+    c = root.select(".//c")
+    c["k"] = "2" #Not accessed through the copy yet
+    second = root.copy(True, copy_on_write = True)
+    c.database.append("more")
+    c.name = "d"
+    assert first.tostring() == expected
+    assert second.tostring() == '<root>\n  <a>\n    <b>\n      <c k="2">text</c>\n    </b>\n  </a>\n</root>\n'
+    assert first.select(".//c/@k") == "1" and second.select(".//c/@k") == "2"
+
+def test_copies_of_copies_and_their_changes():
+    root = XML.from_str('<root><a k="1"><b/></a></root>')
+    copies = [root]
+    expected = []
+    for index in range(5):
+        copies.append(copies[-1].copy(True, copy_on_write = True))
+        expected.append(copies[-1].tostring())
+        copies[index].tags[0]["k"] = f"changed {index}" #Changes the source of the latest copy
+        copies[index].tags[0].tags[0].name = f"changed{index}"
+    for index, copy in enumerate(copies[:-1]): #Each copy only sees its own change
+        assert copy.tostring() == expected[0].replace('k="1"', f'k="changed {index}"').replace("<b/>", f"<changed{index}/>")
+    assert copies[-1].tostring() == expected[-1] == expected[0]
+
+def test_unrelated_tags_are_not_kept_alive():
+    template = XML("template", [XML("child", ["text"])])
+    unrelated = XML("unrelated", [XML("tag") for _ in range(100)])
+    references = [weakref.ref(tag) for tag in unrelated.tags]
+    copy = template.copy(True, copy_on_write = True)
+    unrelated.append(XML("tag"))
+    for tag in unrelated.tags:
+        tag["k"] = "v"
+    del unrelated, tag
+    gc.collect()
+    assert all(reference() is None for reference in references) #Even though the copy is still alive
+    assert copy.tostring() == "<template>\n  <child>text</child>\n</template>\n"
+
+def test_states_are_freed_with_copy():
+    root = XML.from_str("<root><a><b/></a></root>")
+    copy = root.copy(True, copy_on_write = True)
+    removed = root.tags[0].tags[0]
+    reference = weakref.ref(removed)
+    root.tags[0].database.clear()
+    del removed
+    gc.collect()
+    assert reference() is not None #Still read by the copy
+    assert copy.tostring() == "<root>\n  <a>\n    <b/>\n  </a>\n</root>\n"
+    del copy
+    gc.collect()
+    assert reference() is None #The kept states go along with it
+
+def test_garbage_collection_during_changes():
+    threshold = gc.get_threshold()
+    gc.set_threshold(1, 1, 1)
+    try:
+        root = XML.from_str('<root><a k="1"><b>text</b></a><c/></root>')
+        kept = []
+        for index in range(200):
+            copy = root.copy(True, copy_on_write = True)
+            copy.tags[0]["k"] = str(index)
+            cycle = [copy]
+            cycle.append(cycle) #Leaves the copy to the garbage collector, which may free it while the original is being modified
+            if index % 3 == 0:
+                kept.append((copy, copy.tostring()))
+            del copy, cycle
+            root.tags[0].tags[0].name = f"b{index}"
+            root.reduce()
+            root.expand()
+    finally:
+        gc.set_threshold(*threshold)
+    for copy, expected in kept:
+        assert copy.tostring() == expected
+    assert kept[0][0].tags[0]["k"] == "0" and kept[0][0].tags[0].tags[0].name == "b"
+
+def test_copies_added_to_older_tag_take_linear_memory():
+    def memory(count):
+        template = XML.from_str('<template><a k="1"><b>text</b></a></template>')
+        out = XML("out") #Older than the copies, but not part of the template
+        tracemalloc.start()
+        for _ in range(count):
+            out.append(template.copy(True, copy_on_write = True))
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return memory
+    memory(100) #Warm up
+    assert memory(8000) < 2.5 * memory(4000)
+
+def test_assigned_containers_of_copied_structure():
+    entries = [XML("b")]
+    attributes = {"k": "1"}
+    root = XML("root", [XML("a", entries, attributes)])
+    copy = root.copy(True, copy_on_write = True)
+    entries.append(XML("c")) #The copied structure no longer uses the assigned list / dict
+    attributes["k"] = "2"
+    root.tags[0].database.append(XML("d"))
+    root.tags[0]["k"] = "3"
+    assert copy.tostring() == '<root>\n  <a k="1">\n    <b/>\n  </a>\n</root>\n'
+    assert root.tostring() == '<root>\n  <a k="3">\n    <b/>\n    <d/>\n  </a>\n</root>\n'
+
+def test_tags_added_to_copied_structure_keep_their_state():
+    root = XML.from_str("<root><a></a></root>")
+    root.copy(True, copy_on_write = True)
+    added = XML("b", [XML("c")])
+    root.tags[0].append(added)
+    copy = root.copy(True, copy_on_write = True)
+    added.tags[0]["k"] = "1"
+    added.database.append(XML("d"))
+    assert copy.tostring() == "<root>\n  <a>\n    <b>\n      <c/>\n    </b>\n  </a>\n</root>\n"
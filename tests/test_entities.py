@@ -0,0 +1,56 @@
+"""
+Tests: XML.decode() decodes numeric character references exactly once, and XML.encode() returns strings without escaped characters unchanged
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def test_decode_numeric_references():
+    assert XML.decode("&#65;&#x42;&#X43;&#x63;") == "AB&#X43;c" #Only a lowercase x marks a hexadecimal reference
+    assert XML.decode("caf&#233; &#x1F600;") == "café \U0001F600"
+    assert XML.decode("&#0065;&#x00041;") == "AA"
+
+def test_decode_references_to_escaped_characters():
+    assert XML.decode("&#60;tag&#62; &#x26; &#34;&#39;") == "<tag> & \"'"
+    assert XML.decode("&#38;lt;") == "&lt;" #Decoded once, not twice
+    assert XML.decode("&#x26;#65;") == "&#65;"
+    assert XML.decode("&amp;#65;") == "&#65;"
+    assert XML.decode("&amp;lt; &amp;amp;") == "&lt; &amp;"
+
+def test_decode_leaves_invalid_references():
+    for reference in ("&#0;", "&#xD800;", "&#xDFFF;", "&#55296;", "&#x110000;", "&#99999999;", "&#;", "&#x;", "&#12a;", "&#65"):
+        assert XML.decode(reference) == reference
+    assert XML.decode("&#xD800;&#65;&lt;") == "&#xD800;A<"
+
+def test_decode_without_references():
+    text = "plain text without references"
+    assert XML.decode(text) is text
+    assert XML.decode("a & b") == "a & b"
+
+def test_references_are_decoded_when_parsing():
+    root = XML.from_str('<root name="&#60;&#x41;&#38;amp;">&#233;t&#xE9; &#38;lt;</root>')
+    assert root["name"] == "<A&amp;"
+    assert root[0] == "été &lt;"
+    assert XML.from_str(root.tostring())[0] == root[0] #Written escaped, and read back the same
+
+def test_encode_early_out():
+    text = "plain text without escaped characters"
+    assert XML.encode(text) is text
+    assert XML.encode("") == ""
+    for char, encoded in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&apos;")):
+        assert XML.encode(f"a{char}b") == f"a{encoded}b"
+    assert XML.encode("<a & b>") == "&lt;a &amp; b&gt;"
+
+def test_encode_comments():
+    comment = "<!-- a & b -->"
+    assert XML.encode(comment, True) is comment
+    assert XML.encode(comment) == "&lt;!-- a &amp; b --&gt;"
+    assert XML.encode("<!-->", True) == "&lt;!--&gt;" #Too short to be a comment
+
+def test_decode_reverses_encode():
+    for text in ("a & b", "&amp;", "&#65;", "<&lt;>", "'\"", "&&;;"):
+        assert XML.decode(XML.encode(text)) == text
@@ -0,0 +1,176 @@
+"""
+Tests: The name index (XML.__getitem__ / find / find_all) and the attribute indices (XML.build_index) stay consistent with the structure
+
+Usage: python -m pytest tests
+"""
+import gc
+import os
+import sys
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def test_name_index_sees_changes_to_kept_database():
+    root = XML.from_str("<root><a/><b/></root>")
+    database = root.database
+    root["a"] #Builds the name index
+    database.append(XML("c"))
+    assert root["c"] is database[-1]
+    assert root.find_all("c", 1) == [database[-1]]
+    database.remove(database[0])
+    assert root.find("a", 1) is None
+    database[0] = XML("d")
+    assert root.find("b", 1) is None and root["d"] is database[0]
+    database.clear()
+    assert root.find_all("d", 1) == []
+
+def test_name_index_follows_assigned_list():
+    entries = [XML("a")]
+    root = XML("root", entries)
+    assert root["a"] is entries[0]
+    entries.append(XML("b")) #The tag uses the given list itself
+    assert root["b"] is entries[1]
+    assert root.database is entries
+    entries = [XML("c")]
+    root.database = entries
+    assert root.find("b", 1) is None and root["c"] is entries[0]
+    entries[0] = XML("d")
+    assert root.find("c", 1) is None and root.find_all("d", 1) == entries
+
+def test_attribute_index_follows_assigned_list():
+    entries = [XML("part", attributes = {"id": "1"})]
+    root = XML("root", [XML("group", entries)])
+    root.build_index("id")
+    assert root.get_filtered("id", "1") is entries[0]
+    entries.append(XML("part", attributes = {"id": "2"}))
+    assert root.get_filtered("id", "2") is entries[1]
+
+def test_name_index_after_append_and_rename():
+    root = XML("root")
+    for i in range(3):
+        root.append(XML(f"tag{i}"))
+        assert root[f"tag{i}"].name == f"tag{i}"
+    root["tag1"].name = "renamed"
+    assert root.find("tag1", 1) is None and root["renamed"] is root[1]
+
+def test_attribute_index_sees_changes_to_kept_attributes():
+    root = XML.from_str('<root><part id="1"/></root>')
+    part = root["part"]
+    attributes = part.attributes
+    root.build_index("id")
+    attributes["id"] = "9"
+    assert root.get_filtered("id", "9") is part
+    assert root.get_filtered("id", "1") is None
+    attributes.clear()
+    assert root.get_filtered_all("id") == []
+
+def test_attribute_index_follows_assigned_attributes():
+    attributes = {"id": "1"}
+    root = XML("root", (XML("part", attributes = attributes),))
+    root.build_index("id")
+    assert root.get_filtered("id", "1") is root[0]
+    attributes["id"] = "2" #The tag uses the given dict itself
+    assert root.get_filtered("id", "1") is None and root.get_filtered("id", "2") is root[0]
+    assert root[0].attributes is attributes
+    attributes = {"id": "3"}
+    root[0].attributes = attributes
+    attributes["id"] = "4"
+    assert root[0]["id"] == "4" and root.get_filtered("id", "4") is root[0]
+
+def test_attribute_index_kept_on_reads_and_other_changes():
+    root = XML.from_str('<root><part id="0"/><part id="1"/><part id="2"/></root>')
+    root.build_index("id")
+    indices = root._attribute_indices
+    index = indices["id"]
+    for part in root.tags:
+        part.attributes #Read-only access
+        part.database
+        part["seen"] = "1" #Another attribute
+    XML("other").append(XML("part")) #A tag outside the structure
+    assert root.get_filtered("id", "2") is root[2]
+    assert root._attribute_indices is indices and indices["id"] is index
+
+def test_attribute_index_of_nested_owners():
+    root = XML.from_str('<root><group><part id="1"/></group></root>')
+    group = root["group"]
+    root.build_index("id")
+    group.build_index("id")
+    group.database.append(XML("part", attributes = {"id": "2"}))
+    assert root.get_filtered("id", "2") is group[1]
+    assert group.get_filtered("id", "2") is group[1]
+    group[0]["id"] = "3"
+    assert root.get_filtered("id", "1") is None and group.get_filtered("id", "1") is None
+    removed = group.database.pop()
+    removed["id"] = "3"
+    assert root.get_filtered_all("id", "3") == [group[0]]
+
+def test_attribute_index_kept_when_nothing_is_reduced():
+    root = XML.from_str('<root><part id="1"><a/><a/></part></root>')
+    root.build_index("id")
+    index = root._attribute_indices["id"]
+    root.reduce()
+    assert root._attribute_indices["id"] is index
+    root["part"].append(XML("b", ["text"]))
+    root.reduce()
+    assert root._attribute_indices["id"] is None and root["part"]["b"] == "text"
+
+def test_tags_with_kept_containers_are_freed_without_garbage_collection():
+    collect = gc.isenabled()
+    gc.disable()
+    try:
+        tag = XML.from_str('<tag id="1"><a/></tag>')
+        database, attributes = tag.database, tag.attributes
+        reference = weakref.ref(tag)
+        del tag
+        assert reference() is None #Freed by reference counting alone
+        database.append(XML("b")) #The kept containers remain usable on their own
+        attributes["id"] = "2"
+        assert len(database) == 2 and attributes == {"id": "2"}
+    finally:
+        if collect:
+            gc.enable()
+
+def test_reduce_updates_kept_database():
+    root = XML.from_str("<root><a>1</a><b>2</b></root>")
+    database = root.database
+    root.reduce()
+    assert database is root.database and len(database) == 0
+    assert root["a"] == "1" and root.keys() == ["a", "b"]
+    database.append(XML("c"))
+    assert root["c"] is database[0]
+
+def test_name_indices_follow_renamed_tags():
+    root = XML.from_str("<root><a/><b/><b/></root>")
+    copy = root.copy() #Shares the nested tags, so both indices contain them
+    root["a"], copy["a"]
+    a, first, second = root.tags
+    a.name = "c"
+    assert root["c"] is a and copy["c"] is a and root.find("a", 1) is None and copy.find("a", 1) is None
+    second.name = "a"
+    assert root.find_all("b", 1) == [first] and root["a"] is second
+    first.name = "a"
+    assert root.find_all("a", 1) == [first, second] and copy.find_all("a", 1) == [first, second]
+    removed = root.database.pop()
+    removed.name = "d"
+    assert root.find("d", 1) is None and copy["d"] is removed
+
+def test_renaming_keeps_other_name_indices():
+    root = XML("root", [XML(f"tag{i}") for i in range(100)])
+    other = XML("other", [XML("tag")])
+    other["tag"]
+    index = other._index
+    for i, tag in enumerate(root.tags):
+        tag.name = f"renamed{i}"
+        assert root[f"renamed{i}"] is tag
+    assert other._index is index
+    assert [tag.name for tag in root.tags] == [f"renamed{i}" for i in range(100)]
+
+def test_name_index_of_expanded_tags_follows_renames():
+    root = XML("root", attributes = {"a": "1"})
+    root.expand()
+    root["a"].name = "b"
+    assert root["b"].database == ["1"] and root.find("a", 1) is None
+    root.append(XML("c"))
+    root["c"].name = "d"
+    assert root["d"] is root[1]
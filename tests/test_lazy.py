@@ -0,0 +1,34 @@
+"""
+Tests: Lazily loaded tags (XML.from_str(lazy = True)) behave like parsed ones
+
+Usage: python -m pytest tests
+"""
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+document = '<root><a k="1"><b>text</b></a><c/></root>'
+
+def test_unparsed_tags_name_their_own_class():
+    root = XML.from_str(document, lazy = True)
+    tag = root.tags[0]
+    assert isinstance(tag, XML) and type(tag) is not XML
+    assert type(tag).__name__ == type(tag).__qualname__ == "UnparsedXML"
+    tag.attributes #Parses the tag
+    assert type(tag) is XML
+
+def test_lazy_structure_equals_parsed():
+    lazy = XML.from_str(document, lazy = True)
+    assert lazy.tostring() == XML.from_str(document).tostring()
+    assert pickle.loads(pickle.dumps(XML.from_str(document, lazy = True))).tostring() == lazy.tostring()
+
+def test_lazy_nesting_and_comments():
+    for data in (
+        '<a><a x="1"><a/><!-- </a> <a> --><b>t</b></a><ab>x</ab><a >y</a ></a>', #Same-name, short and similarly named tags
+        '<r><!--c--><r><r></r></r><!-- </r> --></r>',
+        "<root>" + "".join(f"<item{i}><!-- <item{i}> -->{i}</item{i}>" for i in range(100)) + "</root>", #Differently named tags
+    ):
+        assert XML.from_str(data, lazy = True, include_comments = True).tostring() == XML.from_str(data, include_comments = True).tostring()
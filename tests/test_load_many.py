@@ -0,0 +1,64 @@
+"""
+Tests: Bulk loading (XML.load_many / XML.aload) reports every file, and errors per file
+
+Usage: python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def make_files(directory):
+    paths = []
+    for index in range(8):
+        path = directory / f"file{index}.xml"
+        if index == 3:
+            path.write_text("<broken><tag></broken>", encoding = "utf-8")
+        elif index != 5: #File 5 is missing
+            XML("root", [XML("index", [str(index)])]).write(path)
+        paths.append(path)
+    return paths
+
+@pytest.mark.parametrize("executor", ("thread", "process"))
+def test_errors_are_reported_per_file(tmp_path, executor):
+    paths = make_files(tmp_path)
+    results = list(XML.load_many(paths, 2, executor))
+    assert [path for path, _, _ in results] == paths
+    for index, (path, tag, error) in enumerate(results):
+        if index in (3, 5):
+            assert tag is None and isinstance(error, Exception)
+        else:
+            assert error is None and tag.tostring() == XML.XMLFile(path).tostring()
+    assert isinstance(results[5][2], FileNotFoundError)
+    with pytest.raises(type(results[3][2])):
+        XML.XMLFile(paths[3])
+
+@pytest.mark.parametrize("executor", ("thread", "process"))
+def test_deeply_nested_file(tmp_path, executor):
+    path = tmp_path / "deep.xml"
+    path.write_text("".join(f"<level{depth}>" for depth in range(3000)) + "text" + "".join(f"</level{depth}>" for depth in reversed(range(3000))), encoding = "utf-8") #Deeper than the recursion limit
+    [(_, tag, error)] = XML.load_many([path], 1, executor)
+    assert error is None
+    assert tag.to_binary() == XML.XMLFile(path).to_binary()
+
+def test_unordered_results_cover_all_files(tmp_path):
+    paths = make_files(tmp_path)
+    with ThreadPoolExecutor(3) as executor:
+        results = list(XML.load_many(paths, executor = executor, ordered = False))
+    assert sorted(str(path) for path, _, _ in results) == sorted(map(str, paths))
+    assert sum(error is not None for _, _, error in results) == 2
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        XML.load_many([], executor = "fiber")
+
+def test_aload_equals_xmlfile(tmp_path):
+    path = make_files(tmp_path)[0]
+    assert asyncio.run(XML.aload(path)).tostring() == XML.XMLFile(path).tostring()
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(XML.aload(tmp_path / "missing.xml"))
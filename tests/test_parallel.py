@@ -0,0 +1,75 @@
+"""
+Tests: Parsing with workers (XML.from_str(..., workers = N)) gives the same result as parsing in a single process
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLStats
+
+def document(records = 400):
+    records = "".join(f'<!-- record {index} --><record id="{index}" kind="{"ab"[index % 2]}"><name>Name &amp; {index}</name><empty/>text {index}<nested><deep value="{index}"/></nested></record>\n' for index in range(records))
+    return f'<?xml version="1.0" encoding="utf-8"?>\n<root version="2">{records}<?xml version="1.1"?><last/><!-- end --></root>\n<trailing/> data'
+
+def assert_same(serial, parallel):
+    stack = [(serial, parallel)]
+    while stack:
+        expected, tag = stack.pop()
+        assert type(tag) is type(expected)
+        assert (tag.name, tag.attributes, tag.format, tag.version, tag.encoding) == (expected.name, expected.attributes, expected.format, expected.version, expected.encoding)
+        assert len(tag.database) == len(expected.database)
+        for expected_entry, entry in zip(expected.database, tag.database):
+            if isinstance(expected_entry, XML):
+                stack.append((expected_entry, entry))
+            else:
+                assert entry == expected_entry
+
+@pytest.mark.parametrize("include_comments", [False, True])
+def test_parallel_parse_equals_serial_parse(include_comments):
+    data = document()
+    serial, serial_trailing = XML.from_str(data, include_comments, True)
+    stats = XMLStats()
+    parallel, trailing = XML.from_str(data, include_comments, True, workers = 2, stats = stats)
+    assert stats.as_dict()["tokenize_time"] == 0 #Only measured when parsed by a single process, so the data was actually split
+    assert_same(serial, parallel)
+    assert trailing == serial_trailing == "\n<trailing/> data"
+    assert parallel.tostring(declaration = True) == serial.tostring(declaration = True)
+    assert (parallel.version, parallel.encoding) == ("1.0", "utf-8")
+    assert parallel["last"].version == "1.1" #Declarations in the body stay with the tag following them
+    assert sum(isinstance(entry, str) and entry.startswith("<!--") for entry in parallel.database) == (401 if include_comments else 0)
+
+def test_parallel_parse_without_trailing():
+    data = document(100)
+    assert_same(XML.from_str(data), XML.from_str(data, workers = 3))
+
+def test_parallel_parse_of_unsplittable_documents():
+    for data in ("<root/>", "<root>only text</root>", "<root><single/></root>"):
+        assert_same(XML.from_str(data), XML.from_str(data, workers = 2))
+
+@pytest.mark.parametrize("old, new", [
+    ('<deep value="200"/>', '<deep value="200">'), #Unclosed tag in the middle of the body
+    ("</root>", ""), #Unclosed root
+    ('<record id="300"', '<record id="300'), #Unclosed header
+    ("<!-- end -->", "<!-- end"), #Unclosed comment
+    ("</record>\n<!-- record 399 -->", "</recorc>\n<!-- record 399 -->"), #Mismatched closing tag
+], ids = ["tag", "root", "header", "comment", "closing tag"])
+def test_parallel_parse_falls_back_on_malformed_data(old, new):
+    data = document().replace(old, new, 1)
+    with pytest.raises(Exception) as serial:
+        XML.from_str(data)
+    with pytest.raises(Exception) as parallel:
+        XML.from_str(data, workers = 2)
+    assert type(parallel.value) is type(serial.value) and str(parallel.value) == str(serial.value)
+
+def test_parallel_parse_of_deep_and_distinct_tags():
+    deep = "".join(f"<level{depth}>" for depth in range(3000)) + "text" + "".join(f"</level{depth}>" for depth in reversed(range(3000))) #Deeper than the recursion limit
+    data = "<root>" + "".join(f"<item{index}>{deep}</item{index}>" for index in range(8)) + "</root>"
+    stats = XMLStats()
+    parallel = XML.from_str(data, workers = 2, stats = stats)
+    assert stats.as_dict()["tokenize_time"] == 0 #Not parsed by a single process instead
+    assert_same(XML.from_str(data), parallel)
+    assert stats.max_depth == 3001
@@ -0,0 +1,68 @@
+"""
+Tests: XML.from_str builds the expected structures, and raises the expected errors for malformed data
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def tree(tag):
+    """
+    Returns a tag as (name, attributes, format, database), with the nested tags in the same form
+    """
+    return (tag.name, dict(tag.attributes), tag.format, [tree(entry) if isinstance(entry, XML) else entry for entry in tag.database])
+
+def test_doctype_is_skipped():
+    root = XML.from_str('<!DOCTYPE note SYSTEM "note.dtd">\n<note><to>x</to></note>')
+    assert tree(root) == ("note", {}, "auto", [("to", {}, "auto", ["x"])])
+
+def test_declarations_belong_to_the_following_tag():
+    root = XML.from_str('<?xml version="1.0" encoding="utf-8"?>\n<root><?xml version="1.1"?><a/><b>t</b></root>')
+    assert tree(root) == ("root", {}, "auto", [("a", {}, "short", []), ("b", {}, "auto", ["t"])])
+    assert (root.version, root.encoding) == ("1.0", "utf-8")
+    assert (root["a"].version, root["a"].encoding) == ("1.1", None)
+    assert root["b"].version is None
+
+def test_multiline_text_is_trimmed_per_line():
+    root = XML.from_str("<root>\n   line one\n      line two  \n   <a>\n  x\n  y\n  </a></root>")
+    assert tree(root) == ("root", {}, "auto", ["\nline one\nline two", ("a", {}, "auto", ["\nx\ny"])])
+
+def test_quoted_attribute_values_may_contain_closing_brackets():
+    root = XML.from_str("""<root a="x>y" b='1>2' c="'>'"><d e="&gt;&amp;&#65;"/></root>""")
+    assert tree(root) == ("root", {"a": "x>y", "b": "1>2", "c": "'>'"}, "auto", [("d", {"e": ">&A"}, "short", [])])
+
+def test_comments():
+    data = "<root><!-- first --><a>text<!-- <b/> --></a></root>"
+    assert tree(XML.from_str(data)) == ("root", {}, "auto", [("a", {}, "auto", ["text"])])
+    assert tree(XML.from_str(data, True)) == ("root", {}, "auto", ["<!-- first -->", ("a", {}, "auto", ["text", "<!-- <b/> -->"])])
+
+def test_closing_tags_with_whitespace():
+    root = XML.from_str("<root><a>1</a ><b>2</b\t></root  >")
+    assert tree(root) == ("root", {}, "auto", [("a", {}, "auto", ["1"]), ("b", {}, "auto", ["2"])])
+
+def test_return_trailing():
+    root, trailing = XML.from_str("\n <root><a/></root> tail <x/>", return_trailing = True)
+    assert tree(root) == ("root", {}, "auto", [("a", {}, "short", [])])
+    assert trailing == " tail <x/>"
+    assert XML.from_str("<root/>", return_trailing = True)[1] == ""
+
+@pytest.mark.parametrize("data, error", [
+    ("", RuntimeError), #No tag at all
+    ("text", RuntimeError),
+    ("<root", EOFError), #Unclosed header
+    ('<root a="1></root>', EOFError), #Unclosed quoted value
+    ("<root>", EOFError), #Missing closing tag
+    ("<root><a></root>", EOFError),
+    ("<root></rot>", EOFError),
+    ("<root><!-- x</root>", EOFError), #Unclosed comment
+    ("<root></root", EOFError), #Closing tag without ">"
+    ("<a></a  x>", EOFError),
+])
+def test_malformed_data(data, error):
+    with pytest.raises(error):
+        XML.from_str(data)
@@ -0,0 +1,61 @@
+"""
+Tests: The query engine (XML.select / select_all / iter_select) follows XPath for the supported subset
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+document = '<root><group><a k="1">one<!-- comment --></a><a k="2">two</a><a>three</a><a k="3"/></group><a k="9"/></root>'
+
+def keys(tags):
+    return [tag.attributes.get("k") for tag in tags]
+
+def test_positions_apply_after_preceding_predicates():
+    root = XML.from_str(document, True)
+    assert keys(root.select_all("group/a[@k][3]")) == ["3"]
+    assert keys(root.select_all("group/a[@k][last()]")) == ["3"]
+    assert keys(root.select_all("group/a[@k='2'][1]")) == ["2"]
+
+def test_predicates_after_positions_filter_the_selected_tags():
+    root = XML.from_str(document, True)
+    assert keys(root.select_all("group/a[3][@k]")) == []
+    assert keys(root.select_all("group/a[2][@k]")) == ["2"]
+
+def test_positions_count_per_parent():
+    root = XML.from_str(document, True)
+    assert keys(root.select_all(".//a[1]")) == ["1", "9"]
+    assert keys(root.select_all(".//a[last()]")) == ["3", "9"]
+
+def test_descendants_are_relative_to_the_context_tag():
+    root = XML.from_str(document, True)
+    group = root.tags[0]
+    assert keys(group.select_all("//a")) == ["1", "2", None, "3"]
+    assert keys(root.select_all("//a")) == ["1", "2", None, "3", "9"]
+    assert group.select_all(".//a/@k") == ["1", "2", "3"]
+
+def test_text_excludes_comments():
+    root = XML.from_str(document, True)
+    assert root.tags[0].tags[0].database[1] == "<!-- comment -->"
+    assert root.select_all("group/a/text()") == ["one", "two", "three"]
+    assert root.select("group/a[1]/text()") == "one"
+
+def test_results_follow_document_order():
+    root = XML.from_str("<root><a><b id='1'><b id='2'/></b></a><b id='3'/></root>")
+    assert root.select_all("//b/@id") == ["1", "2", "3"]
+    assert root.select("//missing", "default") == "default"
+
+def test_descendant_steps_without_name():
+    root = XML.from_str(document, True)
+    group = root.tags[0]
+    for query, equivalent in ((".//./a", ".//a"), ("//./a", "//a"), ("group//./a[1]", "group//a[1]"), (".//.//a", ".//a")):
+        assert root.select_all(query) == root.select_all(equivalent)
+    assert root.select_all(".//.") == [root, *root.select_all(".//*")] #Descendant-or-self: includes the context tag
+    assert root.select_all("group//.") == [group, *group.tags]
+    assert root.select_all("//./@k") == root.select_all(".//a/@k") == ["1", "2", "3", "9"]
+    assert root.select_all("group//./text()") == ["one", "two", "three"]
+    nested = XML.from_str('<root><a k="1"><a k="2"><b/></a></a><a k="3"/></root>')
+    assert [tag.get("k", tag.name) for tag in nested.select_all(".//a//.")] == ["1", "2", "b", "3"] #Nested matches are only selected once
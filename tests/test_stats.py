@@ -0,0 +1,56 @@
+"""
+Tests: Parse / write statistics (XMLStats) count what was parsed / written, whether or not the structure is parsed in parallel
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLStats
+
+def counts(stats):
+    return {name: value for name, value in stats.as_dict().items() if not name.endswith(("_time", "_throughput"))}
+
+document = '<root a="1" b="2"><x>caf\u00e9</x><!-- c --><y k="v"><z/>tail</y></root>' #67 characters, 68 bytes in UTF-8
+written = '<root a="1" b="2">\n  <x>caf\u00e9</x>\n  <!-- c -->\n  <y k="v">\n    <z/>\n    tail\n  </y>\n</root>\n' #91 characters, 92 bytes in UTF-8
+declaration = '<?xml version="1.0" encoding="utf-8"?>\n' #39 characters
+
+def test_parse_counts():
+    stats = XMLStats()
+    XML.from_str(document, True, stats = stats)
+    assert counts(stats) == dict(counts(XMLStats()), documents_parsed = 1, characters_parsed = 67, elements = 4, attributes = 3, text_nodes = 2, comments = 1, max_depth = 2) #Only files count bytes
+    XML.from_str(document, stats = stats)
+    assert (stats.documents_parsed, stats.characters_parsed, stats.elements, stats.comments, stats.comments_skipped) == (2, 134, 8, 1, 1)
+
+def test_file_counts(tmp_path):
+    path = tmp_path / "document.xml"
+    root = XML.from_str(document, True)
+    stats = XMLStats()
+    root.write(path, stats = stats)
+    assert root.tostring() == written
+    assert counts(stats) == dict(counts(XMLStats()), documents_written = 1, characters_written = 91, bytes_written = 3 + 39 + 92, elements_written = 4) #Byte order mark, declaration and the structure
+    stats = XMLStats()
+    XML.XMLFile(path, True, stats = stats)
+    assert counts(stats) == dict(counts(XMLStats()), documents_parsed = 1, characters_parsed = 39 + 90, bytes_parsed = 3 + 39 + 92, elements = 4, attributes = 3, text_nodes = 2, comments = 1, max_depth = 2) #Up to the end of the root, without the final newline
+
+def test_to_bytes_counts():
+    root = XML.from_str(document, True)
+    stats = XMLStats()
+    assert root.to_bytes(stats = stats) == written.encode("utf-8")
+    root.to_bytes(declaration = True, stats = stats)
+    assert counts(stats) == dict(counts(XMLStats()), documents_written = 2, characters_written = 2 * 91, bytes_written = 92 + 39 + 92, elements_written = 8)
+
+def test_parallel_parse_counts_skipped_comments():
+    data = "<root>" + "".join(f'<record id="{index}"><!-- note -->text</record>' for index in range(2000)) + "<!-- end --></root>"
+    serial, parallel = XMLStats(), XMLStats()
+    XML.from_str(data, stats = serial)
+    XML.from_str(data, workers = 2, stats = parallel)
+    assert serial.comments_skipped == 2001
+    assert counts(parallel) == counts(serial)
+
+def test_parallel_fallback_measures_phases():
+    stats = XMLStats()
+    XML.from_str("<root><!-- only -->text</root>", workers = 2, stats = stats) #Without nested tags to split at, so parsed by a single process
+    assert stats.comments_skipped == 1
+    assert stats.times["build"] > 0 and stats.times["tokenize"] > 0
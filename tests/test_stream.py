@@ -0,0 +1,66 @@
+"""
+Tests: Incremental parsing (XMLParser / XML.iterparse) gives the same result as XML.from_str, wherever the data is split
+
+Usage: python -m pytest tests
+"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLParser
+
+document = '<?xml version="1.0" encoding="utf-8"?>\n<root a="x &amp; y">\n  <!-- note -->\n  <item id="1">caf&#233; &lt;1&gt;</item>\n  <item id="2"/>\n  <group><item id="3">three</item></group>\n</root>\n'
+
+def events_of(tag, events):
+    result = []
+    def walk(tag):
+        if "start" in events:
+            result.append(("start", tag.name))
+        for child in tag.tags:
+            walk(child)
+        if "end" in events:
+            result.append(("end", tag.name))
+    walk(tag)
+    return result
+
+@pytest.mark.parametrize("include_comments", (False, True))
+def test_parser_resumes_at_every_boundary(include_comments):
+    expected = XML.from_str(document, include_comments).tostring()
+    for split in range(1, len(document)):
+        parser = XMLParser(include_comments)
+        parser.feed(document[:split])
+        parser.feed(document[split:])
+        assert parser.close().tostring() == expected, split
+
+def test_parser_accepts_single_characters():
+    parser = XMLParser(True, ("start", "end"))
+    events = []
+    for char in document:
+        parser.feed(char)
+        events.extend((event, tag.name) for event, tag in parser.read_events())
+    root = parser.close()
+    events.extend((event, tag.name) for event, tag in parser.read_events())
+    assert root.tostring() == XML.from_str(document, True).tostring()
+    assert events == events_of(root, ("start", "end"))
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 3, 7, 64))
+def test_iterparse_matches_from_str(chunk_size):
+    expected = XML.from_str(document)
+    pairs = list(XML.iterparse(io.StringIO(document), ("start", "end"), chunk_size = chunk_size))
+    assert [(event, tag.name) for event, tag in pairs] == events_of(expected, ("start", "end"))
+    assert pairs[-1][1].tostring() == expected.tostring()
+
+def test_iterparse_reads_binary_files():
+    pairs = list(XML.iterparse(io.BytesIO(document.encode("utf-8-sig")), chunk_size = 5))
+    assert pairs[-1][1].tostring() == XML.from_str(document).tostring()
+
+def test_incomplete_data_raises_like_from_str():
+    with pytest.raises(Exception) as expected:
+        XML.from_str(document[:-12])
+    parser = XMLParser()
+    parser.feed(document[:-12])
+    with pytest.raises(type(expected.value)):
+        parser.close()
@@ -0,0 +1,26 @@
+"""
+Tests: Writing the XML structure (write / tostring / to_bytes)
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML
+
+def test_to_bytes_declares_given_encoding():
+    root = XML("root", ["café"])
+    data = root.to_bytes("latin-1", declaration = True)
+    assert data.startswith(b'<?xml version="1.0" encoding="latin-1"?>\n')
+    assert data.decode("latin-1") == root.tostring(declaration = True).replace("utf-8", "latin-1", 1)
+    assert XML.from_str(data.decode("latin-1")).tostring() == root.tostring()
+
+def test_to_bytes_defaults_to_utf_8():
+    root = XML("root", ["café"])
+    assert root.to_bytes(declaration = True) == root.tostring(declaration = True).encode("utf-8")
+
+def test_to_bytes_with_byte_order_mark_equals_write(tmp_path):
+    root = XML("root", ["café"])
+    root.write(tmp_path / "root.xml")
+    assert root.to_bytes("utf-8-sig", declaration = True) == (tmp_path / "root.xml").read_bytes()
@@ -0,0 +1,73 @@
+"""
+Tests: Streaming a structure with XMLWriter gives exactly the output of XML.write
+
+Usage: python -m pytest tests
+"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XML import XML, XMLWriter
+
+document = '<root a="1"><empty/><text>single</text><multi>line 1\nline 2</multi><mixed>before<inner k="&amp;">x</inner>after</mixed><long></long><nested><a><b/></a></nested></root>'
+
+def structure():
+    root = XML.from_str(document)
+    root.tags[4].format = "long"
+    root.append(XML("short", ["ignored"], format = "short"))
+    root.append(XML("two", ["first", "second"]))
+    return root
+
+def stream(writer, tag):
+    """
+    Writes tag using start() / end() for every tag, and write() for the text entries only
+    """
+    writer.start(tag.name, tag.attributes, tag.format)
+    for entry in tag.database:
+        if isinstance(entry, XML):
+            stream(writer, entry)
+        else:
+            writer.write(entry)
+    writer.end()
+
+@pytest.mark.parametrize("allow_compact", (True, False))
+@pytest.mark.parametrize("depth", (0, 2))
+def test_streamed_tags_equal_write(allow_compact, depth):
+    root = structure()
+    expected = io.StringIO()
+    root.write(expected, allow_compact, depth)
+    output = io.StringIO()
+    writer = XMLWriter(output, allow_compact, depth)
+    stream(writer, root)
+    writer.close()
+    assert output.getvalue() == expected.getvalue()
+
+def test_written_subtrees_equal_write():
+    root = structure()
+    output = io.StringIO()
+    with XMLWriter(output) as writer:
+        with writer.element(root.name, root.attributes):
+            for entry in root.database:
+                writer.write(entry)
+    assert output.getvalue() == root.tostring()
+
+def test_file_output_equals_write(tmp_path):
+    root = structure()
+    root.write(tmp_path / "expected.xml")
+    with XMLWriter(tmp_path / "streamed.xml") as writer:
+        stream(writer, root)
+    assert (tmp_path / "streamed.xml").read_bytes() == (tmp_path / "expected.xml").read_bytes()
+
+def test_close_completes_opened_tags():
+    output = io.StringIO()
+    writer = XMLWriter(output)
+    writer.start("root")
+    writer.start("inner")
+    writer.write("text")
+    writer.close()
+    assert output.getvalue() == XML("root", [XML("inner", ["text"])]).tostring()
+    with pytest.raises(ValueError):
+        writer.write("more")